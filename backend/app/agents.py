@@ -1,22 +1,49 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
 from textwrap import dedent
-from typing import Any
+from typing import Any, Callable, Optional, TypeVar
 
 from crewai import Agent, Crew, Process, Task
 from crewai import LLM
 
-from app.config import GROQ_API_KEY, GROQ_MODEL
+from app.config import (
+    EVAL_MAX_CONCURRENCY,
+    EVAL_MAX_RETRIES,
+    EVAL_SHARD_SIZE,
+    GROQ_API_KEY,
+    GROQ_MODEL,
+    WRITER_MAX_CONCURRENCY,
+)
+from app import llm_cache
+from app.context import estimate_tokens
+from app.llm_runtime import Priority, kickoff
 from app.models import (
     CandidateEvaluation,
+    CandidateFailure,
     GapItem,
     JDAnalysis,
+    LLMCallStats,
     OutreachEmail,
 )
 
 
+# Bump when prompts or output parsing change, to invalidate cached responses
+PROMPT_SCHEMA_VERSION = "1"
+
+T = TypeVar("T")
+
+_WRITER_EVAL_FIELDS = {
+    "resume_id",
+    "candidate_name",
+    "match_percentage",
+    "strengths",
+    "notable_projects",
+}
+
+
 # LLM factory (Groq)
 def _build_llm() -> LLM:
     return LLM(
@@ -148,25 +175,22 @@ def _writer_agent(llm: LLM) -> Agent:
 
 def _writer_task(
     agent: Agent,
-    evaluations_json: str,
+    evaluation_json: str,
     jd_analysis_json: str,
-    resumes: list[dict],
+    resume: dict,
 ) -> Task:
-    resumes_block = "\n---\n".join(
-        f"RESUME_ID: {r['resume_id']}\n\n{r['text']}" for r in resumes
-    )
     return Task(
         description=dedent(f"""\
-            For each of the following shortlisted candidate evaluations,
-            write a personalised outreach email.
+            For the following shortlisted candidate evaluation, write a
+            personalised outreach email.
 
-            Each email MUST:
+            The email MUST:
             1. Address the candidate by name.
             2. Mention a SPECIFIC project or achievement from their resume.
             3. Explain why their background is a great fit for the role.
             4. Keep the tone professional yet warm, and under 200 words.
 
-            Return a JSON ARRAY of objects with keys:
+            Return a single JSON object with keys:
             - resume_id (string)
             - candidate_name (string)
             - subject (string – the email subject line)
@@ -177,85 +201,293 @@ def _writer_task(
             === JD ANALYSIS ===
             {jd_analysis_json}
 
-            === EVALUATIONS ===
-            {evaluations_json}
+            === EVALUATION ===
+            {evaluation_json}
 
-            === RESUMES ===
-            {resumes_block}
+            === RESUME ===
+            RESUME_ID: {resume['resume_id']}
+
+            {resume['text']}
         """),
-        expected_output="A raw JSON array of email objects.",
+        expected_output="A single raw JSON email object.",
         agent=agent,
     )
 
 
 #  PUBLIC CREW RUNNERS
 
-def _parse_json(raw: str) -> Any:
+def _strip_fences(raw: str) -> str:
     # Strip markdown code fences if present
     cleaned = re.sub(r"```(?:json)?\s*", "", raw)
-    cleaned = cleaned.strip().rstrip("`")
-    return json.loads(cleaned)
+    return cleaned.strip().rstrip("`")
 
 
-async def run_researcher(jd_text: str) -> JDAnalysis:
-    llm = _build_llm()
-    agent = _researcher_agent(llm)
-    task = _researcher_task(agent, jd_text)
+def _parse_json(raw: str) -> Any:
+    return json.loads(_strip_fences(raw))
+
+
+def _parse_json_objects(raw: str) -> list[Any]:
+    """Decode a JSON array; if it is malformed, salvage every complete top-level object."""
+    cleaned = _strip_fences(raw)
+    try:
+        parsed = json.loads(cleaned)
+    except json.JSONDecodeError:
+        decoder = json.JSONDecoder()
+        parsed, pos = [], cleaned.find("{")
+        while pos != -1:
+            try:
+                obj, end = decoder.raw_decode(cleaned, pos)
+            except json.JSONDecodeError:
+                pos = cleaned.find("{", pos + 1)
+                continue
+            parsed.append(obj)
+            pos = cleaned.find("{", end)
+    return parsed if isinstance(parsed, list) else [parsed]
+
+
+async def _run_crew(
+    agent: Agent,
+    task: Task,
+    parse: Callable[[str], T],
+    use_cache: bool,
+    usage: Optional[list[LLMCallStats]] = None,
+    priority: Priority = Priority.NORMAL,
+    cacheable: Callable[[T], bool] = lambda _: True,
+) -> T:
     crew = Crew(
         agents=[agent],
         tasks=[task],
         process=Process.sequential,
         verbose=True,
     )
-    result = crew.kickoff()
-    parsed = _parse_json(result.raw)
-    return JDAnalysis(**parsed)
+    stats = LLMCallStats(
+        agent=agent.role,
+        estimated_prompt_tokens=estimate_tokens(llm_cache.render_prompt(crew)),
+    )
+    # Identical prompt at temperature 0 → serve the cached raw response
+    key = llm_cache.make_key(GROQ_MODEL, PROMPT_SCHEMA_VERSION, crew)
+    cached = await asyncio.to_thread(llm_cache.get, key, not use_cache)
+    if cached is not None:
+        try:
+            value = parse(cached)
+            stats.cached = True
+            if usage is not None:
+                usage.append(stats)
+            return value
+        except Exception:
+            pass  # stale/unparseable entry → fall through to a live call
+
+    result = await kickoff(
+        crew, priority=priority, estimated_tokens=stats.estimated_prompt_tokens
+    )
+    token_usage = getattr(result, "token_usage", None)
+    if token_usage is not None:
+        stats.prompt_tokens = token_usage.prompt_tokens
+        stats.completion_tokens = token_usage.completion_tokens
+    if usage is not None:
+        usage.append(stats)
+    value = parse(result.raw)
+    # Only responses that parsed cleanly (and completely) are worth replaying
+    if cacheable(value):
+        await asyncio.to_thread(llm_cache.put, key, result.raw)
+    return value
+
+
+async def run_researcher(
+    jd_text: str,
+    use_cache: bool = True,
+    usage: Optional[list[LLMCallStats]] = None,
+) -> JDAnalysis:
+    llm = _build_llm()
+    agent = _researcher_agent(llm)
+    task = _researcher_task(agent, jd_text)
+    return await _run_crew(
+        agent, task, lambda raw: JDAnalysis(**_parse_json(raw)), use_cache, usage
+    )
 
 
-async def run_evaluator(
-    jd_analysis: JDAnalysis,
+def _parse_evaluations(
+    raw: str, resume_ids: list[str]
+) -> tuple[list[CandidateEvaluation], dict[str, str]]:
+    """Validate each item on its own; returns the good evaluations and an
+    error per resume_id that was not evaluated."""
+    expected = set(resume_ids)
+    evaluations: dict[str, CandidateEvaluation] = {}
+    errors: dict[str, str] = {}
+    for item in _parse_json_objects(raw):
+        if not isinstance(item, dict):
+            continue
+        resume_id = str(item.get("resume_id", ""))
+        # Unknown ids (hallucinated / mangled) and repeats are dropped
+        if resume_id not in expected or resume_id in evaluations:
+            continue
+        try:
+            # Normalise gap_analysis items
+            item["gap_analysis"] = [
+                GapItem(**g) if isinstance(g, dict) else GapItem(skill=str(g))
+                for g in item.get("gap_analysis") or []
+            ]
+            evaluations[resume_id] = CandidateEvaluation(**item)
+        except Exception as exc:
+            errors[resume_id] = f"Invalid evaluation: {exc}"
+    for resume_id in expected - evaluations.keys():
+        errors.setdefault(resume_id, "Missing from evaluator response")
+    return list(evaluations.values()), errors
+
+
+async def _evaluate_shard(
+    jd_json: str,
     resumes: list[dict],
-) -> list[CandidateEvaluation]:
+    use_cache: bool = True,
+    usage: Optional[list[LLMCallStats]] = None,
+) -> tuple[list[CandidateEvaluation], dict[str, str]]:
     llm = _build_llm()
     agent = _evaluator_agent(llm)
-    jd_json = jd_analysis.model_dump_json()
     task = _evaluator_task(agent, jd_json, resumes)
-    crew = Crew(
-        agents=[agent],
-        tasks=[task],
-        process=Process.sequential,
-        verbose=True,
+    return await _run_crew(
+        agent,
+        task,
+        lambda raw: _parse_evaluations(raw, [r["resume_id"] for r in resumes]),
+        use_cache,
+        usage,
+        priority=Priority.BULK,
+        # A partial answer would be replayed as the same partial answer
+        cacheable=lambda result: not result[1],
     )
-    result = crew.kickoff()
-    parsed = _parse_json(result.raw)
+
+
+async def run_evaluator(
+    jd_analysis: JDAnalysis,
+    resumes: list[dict],
+    shard_size: Optional[int] = None,
+    on_shard: Optional[Callable[[list[CandidateEvaluation]], None]] = None,
+    on_failure: Optional[Callable[[list[CandidateFailure]], None]] = None,
+    use_cache: bool = True,
+    usage: Optional[list[LLMCallStats]] = None,
+    max_retries: Optional[int] = None,
+) -> list[CandidateEvaluation]:
+    # Split resumes into shards evaluated concurrently (one LLM call each)
+    size = max(1, shard_size or EVAL_SHARD_SIZE)
+    shards = [resumes[i : i + size] for i in range(0, len(resumes), size)]
+    retries = EVAL_MAX_RETRIES if max_retries is None else max(0, max_retries)
+    jd_json = jd_analysis.model_dump_json()
+    semaphore = asyncio.Semaphore(EVAL_MAX_CONCURRENCY)
     evaluations: list[CandidateEvaluation] = []
-    for item in parsed:
-        # Normalise gap_analysis items
-        gaps = [
-            GapItem(**g) if isinstance(g, dict) else GapItem(skill=str(g))
-            for g in item.get("gap_analysis", [])
-        ]
-        item["gap_analysis"] = gaps
-        evaluations.append(CandidateEvaluation(**item))
+    failures: list[CandidateFailure] = []
+
+    async def _attempt(batch: list[dict]) -> dict[str, str]:
+        async with semaphore:
+            try:
+                evals, errors = await _evaluate_shard(jd_json, batch, use_cache, usage)
+            except Exception as exc:
+                # A failed call only costs this batch, never the whole run
+                return {r["resume_id"]: f"{type(exc).__name__}: {exc}" for r in batch}
+        evaluations.extend(evals)
+        # Surface results as soon as this batch lands
+        if evals and on_shard is not None:
+            on_shard(evals)
+        return errors
+
+    async def _run(shard: list[dict]) -> None:
+        errors = await _attempt(shard)
+        attempts = 1
+        # Retry only the unresolved resumes, one per call, so a bad one can't
+        # take its shard-mates down with it again
+        while errors and attempts <= retries:
+            pending = [r for r in shard if r["resume_id"] in errors]
+            results = await asyncio.gather(*(_attempt([r]) for r in pending))
+            errors = {rid: err for res in results for rid, err in res.items()}
+            attempts += 1
+        if errors:
+            failed = [
+                CandidateFailure(
+                    resume_id=r["resume_id"],
+                    filename=r.get("filename", ""),
+                    error=errors[r["resume_id"]],
+                    attempts=attempts,
+                )
+                for r in shard
+                if r["resume_id"] in errors
+            ]
+            failures.extend(failed)
+            if on_failure is not None:
+                on_failure(failed)
+
+    await asyncio.gather(*(_run(shard) for shard in shards))
+    if resumes and not evaluations:
+        raise RuntimeError(
+            f"All {len(resumes)} candidates failed evaluation: {failures[0].error}"
+        )
     return evaluations
 
 
+def _parse_email(raw: str, evaluation: CandidateEvaluation) -> OutreachEmail:
+    parsed = _parse_json(raw)
+    if isinstance(parsed, list):
+        parsed = parsed[0]
+    # Identity comes from the evaluation, never from the model's copy of it
+    parsed.update(resume_id=evaluation.resume_id, candidate_name=evaluation.candidate_name)
+    return OutreachEmail(**parsed)
+
+
+async def _write_email(
+    jd_json: str,
+    evaluation: CandidateEvaluation,
+    resume: dict,
+    use_cache: bool = True,
+    usage: Optional[list[LLMCallStats]] = None,
+    priority: Priority = Priority.INTERACTIVE,
+) -> OutreachEmail:
+    llm = _build_llm()
+    agent = _writer_agent(llm)
+    # The copywriter only needs the hooks, not the full scoring rationale
+    eval_json = json.dumps(evaluation.model_dump(include=_WRITER_EVAL_FIELDS))
+    task = _writer_task(agent, eval_json, jd_json, resume)
+    return await _run_crew(
+        agent,
+        task,
+        lambda raw: _parse_email(raw, evaluation),
+        use_cache,
+        usage,
+        priority=priority,
+    )
+
+
 async def run_writer(
     jd_analysis: JDAnalysis,
     evaluations: list[CandidateEvaluation],
     resumes: list[dict],
+    on_email: Optional[Callable[[OutreachEmail], None]] = None,
+    on_failure: Optional[Callable[[str, str], None]] = None,
+    use_cache: bool = True,
+    usage: Optional[list[LLMCallStats]] = None,
+    priority: Priority = Priority.INTERACTIVE,
 ) -> list[OutreachEmail]:
-    llm = _build_llm()
-    agent = _writer_agent(llm)
+    # One writer call per candidate, carrying only that candidate's context
     jd_json = jd_analysis.model_dump_json()
-    evals_json = json.dumps([e.model_dump() for e in evaluations])
-    task = _writer_task(agent, evals_json, jd_json, resumes)
-    crew = Crew(
-        agents=[agent],
-        tasks=[task],
-        process=Process.sequential,
-        verbose=True,
-    )
-    result = crew.kickoff()
-    parsed = _parse_json(result.raw)
-    return [OutreachEmail(**e) for e in parsed]
+    by_id = {r["resume_id"]: r for r in resumes}
+    semaphore = asyncio.Semaphore(WRITER_MAX_CONCURRENCY)
+    emails: list[OutreachEmail] = []
+    errors: list[str] = []
+
+    async def _run(evaluation: CandidateEvaluation) -> None:
+        resume = by_id.get(evaluation.resume_id) or {"resume_id": evaluation.resume_id, "text": ""}
+        async with semaphore:
+            try:
+                email = await _write_email(
+                    jd_json, evaluation, resume, use_cache, usage, priority
+                )
+            except Exception as exc:
+                errors.append(f"{type(exc).__name__}: {exc}")
+                if on_failure is not None:
+                    on_failure(evaluation.resume_id, errors[-1])
+                return
+        emails.append(email)
+        # Surface each email as soon as it is drafted
+        if on_email is not None:
+            on_email(email)
+
+    await asyncio.gather(*(_run(ev) for ev in evaluations))
+    if evaluations and not emails:
+        raise RuntimeError(f"All {len(evaluations)} emails failed: {errors[0]}")
+    return emails
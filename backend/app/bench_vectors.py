@@ -0,0 +1,119 @@
+"""Benchmark vector-store backends on synthetic chunk embeddings.
+
+    python -m app.bench_vectors --chunks 20000 --queries 200
+    python -m app.bench_vectors --chunks 50000 --backends numpy-float16 numpy-int8
+
+Each backend is built in a temporary directory from the same random unit
+vectors (no embedding model is loaded), then queried with the same vectors.
+Reports build time, query latency (p50/p95), recall@k against exact float32
+search and on-disk size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.vector_backends import ChromaBackend, NumpyBackend, VectorBackend
+
+BACKENDS = ("chroma", "numpy-float16", "numpy-int8")
+
+
+def _make_backend(name: str, path: Path) -> VectorBackend:
+    if name == "chroma":
+        return ChromaBackend(path)
+    if name.startswith("numpy-"):
+        return NumpyBackend(path, dtype=name.split("-", 1)[1])
+    raise ValueError(f"Unknown backend: {name}")
+
+
+def _dir_size_mb(path: Path) -> float:
+    # Allocated blocks, so sparse (not yet written) index capacity doesn't count
+    return sum(p.stat().st_blocks * 512 for p in path.rglob("*") if p.is_file()) / 2**20
+
+
+def run(
+    names: list[str],
+    chunks: int,
+    queries: int,
+    dim: int,
+    per_resume: int,
+    k: int,
+    batch_size: int,
+) -> list[dict]:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Queries near stored chunks, like a JD close to a few resumes
+    picks = rng.integers(0, chunks, size=queries)
+    probes = vectors[picks] + 0.5 * rng.standard_normal((queries, dim)).astype(np.float32) / np.sqrt(dim)
+    exact = np.argsort(-(probes @ vectors.T), axis=1)[:, :k]
+
+    ids = [f"c{i}" for i in range(chunks)]
+    metadatas = [
+        {"resume_id": f"r{i // per_resume}", "filename": f"r{i // per_resume}.pdf", "chunk_index": i % per_resume}
+        for i in range(chunks)
+    ]
+    documents = [f"chunk {i}" for i in range(chunks)]
+
+    results: list[dict] = []
+    for name in names:
+        path = Path(tempfile.mkdtemp(prefix=f"bench_{name}_"))
+        try:
+            backend = _make_backend(name, path)
+            started = time.perf_counter()
+            for start in range(0, chunks, batch_size):
+                end = start + batch_size
+                backend.upsert(ids[start:end], documents[start:end], metadatas[start:end], vectors[start:end])
+            build = time.perf_counter() - started
+
+            latencies, hits = [], 0
+            for qi, probe in enumerate(probes):
+                t0 = time.perf_counter()
+                found = backend.query(probe, k)
+                latencies.append(time.perf_counter() - t0)
+                got = {int(doc.split()[1]) for _, doc, _ in found}
+                hits += len(got & set(exact[qi].tolist()))
+            results.append(
+                {
+                    "backend": name,
+                    "build_s": round(build, 2),
+                    "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+                    "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+                    f"recall@{k}": round(hits / (queries * k), 4),
+                    "disk_mb": round(_dir_size_mb(path), 1),
+                }
+            )
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark vector-store backends.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)  # all-MiniLM-L6-v2
+    parser.add_argument("--chunks-per-resume", type=int, default=8)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    rows = run(
+        args.backends, args.chunks, args.queries, args.dim,
+        args.chunks_per_resume, args.k, args.batch_size,
+    )
+    columns = list(rows[0]) if rows else []
+    print("  ".join(f"{c:>14}" for c in columns))
+    for row in rows:
+        print("  ".join(f"{row[c]!s:>14}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
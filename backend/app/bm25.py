@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+# Keeps tech tokens intact: "c++", "c#", "node.js", "aws-saa-c03", "pyspark"
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+
+
+def tokenize(text: str) -> list[str]:
+    return [t.rstrip(".-") for t in _TOKEN_RE.findall(text.lower())]
+
+
+class BM25Index:
+    """In-memory Okapi BM25 inverted index over whole resumes."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: dict[str, dict[str, int]] = defaultdict(dict)  # term → {doc: tf}
+        self._doc_len: dict[str, int] = {}
+        self._doc_terms: dict[str, list[str]] = {}
+        self._filenames: dict[str, str] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def filename(self, doc_id: str) -> str:
+        return self._filenames.get(doc_id, "")
+
+    def add(self, doc_id: str, filename: str, text: str) -> None:
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        with self._lock:
+            self._remove_locked(doc_id)
+            for term, tf in counts.items():
+                self._postings[term][doc_id] = tf
+            self._doc_len[doc_id] = len(tokens)
+            self._doc_terms[doc_id] = list(counts)
+            self._filenames[doc_id] = filename
+            self._total_len += len(tokens)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str) -> None:
+        if doc_id not in self._doc_len:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        self._filenames.pop(doc_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_len.clear()
+            self._doc_terms.clear()
+            self._filenames.clear()
+            self._total_len = 0
+
+    def search(
+        self,
+        query: str,
+        top_n: int,
+        allowed: Optional[Iterable[str]] = None,
+    ) -> list[tuple[str, float]]:
+        allowed_set = set(allowed) if allowed is not None else None
+        terms = set(tokenize(query))
+        scores: dict[str, float] = defaultdict(float)
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if n_docs == 0:
+                return []
+            avg_len = self._total_len / n_docs
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if allowed_set is not None and doc_id not in allowed_set:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_n]
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> dict[str, float]:
+    fused: dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (k + rank)
+    return dict(fused)
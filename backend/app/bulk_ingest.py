@@ -0,0 +1,206 @@
+"""Offline bulk ingestion of resume directories / zip archives.
+
+    python -m app.bulk_ingest /path/to/cvs            # or cvs.zip
+    python -m app.bulk_ingest cvs.zip --batch-docs 128 --restart
+
+Writes into the same vector store and STATE_DB_PATH the API uses. Progress is
+checkpointed per batch, so re-running the same command after an interruption
+skips everything already ingested. Run it while the API is stopped (neither
+vector backend is safe for concurrent writers across processes) and restart the API afterwards so its
+keyword index picks up the new resumes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.cache import sha256_hex
+from app.config import CACHE_DIR, DOCUMENT_CACHE_SIZE, EMBED_BATCH_SIZE, STATE_DB_PATH
+from app.dedup import get_index as get_dedup_index
+from app.dedup import link_duplicates
+from app.ingestion import save_and_extract_many
+from app.ingestion import shutdown as shutdown_ingestion
+from app.models import DocumentMeta
+from app.store import DocumentStore
+from app.vector_store import add_resumes, delete_resumes
+
+SUPPORTED_SUFFIXES = {".pdf", ".txt", ".text", ".md"}
+
+
+# ── Source walking ────────────────────────────────────────────────────────────
+
+def list_sources(source: Path) -> list[str]:
+    """Stable keys (relative paths / archive members) of every ingestible file."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            names = [i.filename for i in zf.infolist() if not i.is_dir()]
+    else:
+        names = [str(p.relative_to(source)) for p in source.rglob("*") if p.is_file()]
+    return sorted(
+        n for n in names
+        if Path(n).suffix.lower() in SUPPORTED_SUFFIXES and not Path(n).name.startswith(".")
+    )
+
+
+def read_batch(source: Path, keys: list[str]) -> Iterator[tuple[str, bytes]]:
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for key in keys:
+                yield key, zf.read(key)
+    else:
+        for key in keys:
+            yield key, (source / key).read_bytes()
+
+
+# ── Checkpoint (append-only JSONL: one line per finished file) ───────────────
+
+def default_checkpoint(source: Path) -> Path:
+    return CACHE_DIR / f"bulk_ingest_{sha256_hex(str(source.resolve()))[:16]}.jsonl"
+
+
+def load_checkpoint(path: Path) -> set[str]:
+    done: set[str] = set()
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line from an interrupted write
+            if entry.get("resume_id"):
+                done.add(entry["key"])
+    return done
+
+
+def append_checkpoint(path: Path, entries: list[dict]) -> None:
+    with path.open("a", encoding="utf-8") as fh:
+        for entry in entries:
+            fh.write(json.dumps(entry) + "\n")
+
+
+# ── Ingestion ─────────────────────────────────────────────────────────────────
+
+async def _extract(source: Path, keys: list[str]) -> list[tuple[str, DocumentMeta | Exception]]:
+    files = list(read_batch(source, keys))
+    # Keep the archive path in the filename so same-named CVs stay distinct
+    payloads = [(key.replace("/", "__"), data) for key, data in files]
+    results = await save_and_extract_many(payloads, doc_type="resume")
+    return list(zip(keys, results))
+
+
+async def ingest(
+    source: Path,
+    batch_docs: int = 64,
+    embed_batch_size: int = EMBED_BATCH_SIZE,
+    checkpoint: Optional[Path] = None,
+    restart: bool = False,
+) -> dict:
+    checkpoint = checkpoint or default_checkpoint(source)
+    if restart:
+        checkpoint.unlink(missing_ok=True)
+    done = load_checkpoint(checkpoint)
+    pending = [k for k in list_sources(source) if k not in done]
+    batches = [pending[i : i + batch_docs] for i in range(0, len(pending), batch_docs)]
+    documents = DocumentStore(STATE_DB_PATH, cache_size=DOCUMENT_CACHE_SIZE)
+    # Signatures left behind by an interrupted run would mark its files as
+    # duplicates of resumes that were never stored
+    orphans = get_dedup_index().prune_orphans()
+
+    stats = {"skipped": len(done), "documents": 0, "duplicates": 0, "chunks": 0, "failed": 0}
+    started = time.perf_counter()
+    print(f"{len(pending)} files to ingest ({len(done)} already done) from {source}")
+    if orphans:
+        print(f"  dropped {orphans} near-duplicate signatures from an interrupted run")
+
+    # Extraction of batch k+1 (process pool) overlaps embedding of batch k (thread)
+    next_extract = asyncio.create_task(_extract(source, batches[0])) if batches else None
+    for i in range(len(batches)):
+        extracted = await next_extract
+        if i + 1 < len(batches):
+            next_extract = asyncio.create_task(_extract(source, batches[i + 1]))
+
+        metas = [m for _, m in extracted if isinstance(m, DocumentMeta)]
+        entries: list[dict] = []
+        for key, outcome in extracted:
+            if isinstance(outcome, BaseException):
+                stats["failed"] += 1
+                entries.append({"key": key, "error": str(outcome)})
+        if metas:
+            # Near-duplicates are linked to their canonical resume, not embedded
+            fresh = await asyncio.to_thread(link_duplicates, metas)
+            try:
+                counts = await asyncio.to_thread(
+                    add_resumes,
+                    [(m.id, m.filename, m.text) for m in fresh],
+                    embed_batch_size,
+                    False,
+                )
+                documents.put_many(metas)
+            except BaseException:
+                # Drop chunks from embedding batches that did land, and unlink
+                # the batch so a re-run doesn't treat it as duplicates of
+                # resumes that were never stored
+                delete_resumes([m.id for m in fresh])
+                get_dedup_index().remove([m.id for m in fresh])
+                raise
+            stats["documents"] += len(metas)
+            stats["duplicates"] += len(metas) - len(fresh)
+            stats["chunks"] += sum(counts.values())
+            entries.extend(
+                {"key": key, "resume_id": m.id}
+                for key, m in extracted
+                if isinstance(m, DocumentMeta)
+            )
+        # Only record a batch once it is embedded and stored
+        append_checkpoint(checkpoint, entries)
+        print(
+            f"  batch {i + 1}/{len(batches)}: {stats['documents']} docs "
+            f"({stats['duplicates']} near-duplicates), {stats['chunks']} chunks, "
+            f"{stats['failed']} failed"
+        )
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 2)
+    stats["docs_per_sec"] = round(stats["documents"] / elapsed, 2) if elapsed else 0.0
+    stats["chunks_per_sec"] = round(stats["chunks"] / elapsed, 2) if elapsed else 0.0
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk-ingest resumes from a directory or zip archive.")
+    parser.add_argument("source", type=Path, help="directory or .zip of PDF/TXT resumes")
+    parser.add_argument("--batch-docs", type=int, default=64, help="files extracted/indexed per batch")
+    parser.add_argument("--embed-batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding call")
+    parser.add_argument("--checkpoint", type=Path, default=None, help="progress file (default: under CACHE_DIR)")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args(argv)
+
+    if not args.source.exists():
+        parser.error(f"{args.source} does not exist")
+    try:
+        stats = asyncio.run(
+            ingest(
+                args.source,
+                batch_docs=max(1, args.batch_docs),
+                embed_batch_size=max(1, args.embed_batch_size),
+                checkpoint=args.checkpoint,
+                restart=args.restart,
+            )
+        )
+    finally:
+        shutdown_ingestion()
+    print(
+        f"Ingested {stats['documents']} docs / {stats['chunks']} chunks in {stats['seconds']}s "
+        f"({stats['docs_per_sec']} docs/sec, {stats['chunks_per_sec']} chunks/sec); "
+        f"{stats['duplicates']} near-duplicates linked, {stats['failed']} failed, "
+        f"{stats['skipped']} skipped"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from app.config import CACHE_DIR, EMBEDDING_CACHE_MAX_MB, TEXT_CACHE_MAX_MB
+
+
+def sha256_hex(data: bytes | str) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobCache:
+    """Persistent key → bytes store (SQLite) with size-bounded LRU eviction."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON entries(last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        found: dict[str, bytes] = {}
+        with self._lock:
+            # SQLite caps bound parameters, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                part = keys[start : start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({marks})", part
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self._conn.commit()
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                [(k, v, len(v), now) for k, v in items.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many({key: value})
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in rows])
+            total -= sum(size for _, size in rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+
+# Singletons
+_text_cache: BlobCache | None = None
+_embedding_cache: BlobCache | None = None
+
+
+def get_text_cache() -> BlobCache:
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = BlobCache(CACHE_DIR / "text.sqlite3", TEXT_CACHE_MAX_MB * 1024 * 1024)
+    return _text_cache
+
+
+def get_embedding_cache() -> BlobCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = BlobCache(
+            CACHE_DIR / "embeddings.sqlite3", EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _embedding_cache
+
+
+class CachedEmbeddingFunction:
+    """Wraps an embedding function with a cache keyed by chunk hash + model name."""
+
+    def __init__(self, inner: Callable[[list[str]], list], model_name: str):
+        self._inner = inner
+        self._model_name = model_name
+
+    def _key(self, text: str) -> str:
+        return f"{self._model_name}:{sha256_hex(text)}"
+
+    def __call__(self, input: list[str]) -> list[np.ndarray]:
+        cache = get_embedding_cache()
+        keys = [self._key(doc) for doc in input]
+        cached = cache.get_many(keys)
+
+        # Embed only the chunks we have never seen with this model
+        missing = [i for i, k in enumerate(keys) if k not in cached]
+        vectors: dict[int, np.ndarray] = {}
+        if missing:
+            fresh = self._inner([input[i] for i in missing])
+            new_entries: dict[str, bytes] = {}
+            for i, vec in zip(missing, fresh):
+                arr = np.asarray(vec, dtype=np.float32)
+                vectors[i] = arr
+                new_entries[keys[i]] = arr.tobytes()
+            cache.put_many(new_entries)
+
+        return [
+            vectors[i] if i in vectors else np.frombuffer(cached[k], dtype=np.float32)
+            for i, k in enumerate(keys)
+        ]
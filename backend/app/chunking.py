@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from typing import NamedTuple, Optional, Protocol
+
+from app.config import CHUNK_MAX_TOKENS, CHUNKER, EMBEDDING_MODEL
+
+# Legacy fixed window (also used to rebuild chunks stored without offsets)
+FIXED_MAX_CHARS = 2000
+FIXED_OVERLAP = 200
+
+# Resume headings we recognise as section boundaries
+_SECTION_NAMES = (
+    "summary|profile|objective|about me|experience|work experience|employment|"
+    "professional experience|work history|education|skills|technical skills|"
+    "projects|certifications|certificates|awards|achievements|publications|"
+    "languages|interests|hobbies|references|declaration|personal details|volunteering"
+)
+_HEADING_RE = re.compile(
+    rf"^[ \t]*(?P<name>{_SECTION_NAMES})[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\n")
+
+
+class Chunk(NamedTuple):
+    start: int  # char offset in the source text; chunks tile the text exactly
+    text: str
+    section: str = ""
+
+
+class Chunker(Protocol):
+    def chunk(self, text: str) -> list[Chunk]: ...
+
+    def chunk_many(self, texts: list[str]) -> list[list[Chunk]]: ...
+
+
+class FixedCharChunker:
+    """The original 2000-char / 200-overlap sliding window."""
+
+    def __init__(self, max_chars: int = FIXED_MAX_CHARS, overlap: int = FIXED_OVERLAP):
+        self.max_chars = max_chars
+        self.overlap = overlap
+
+    def chunk(self, text: str) -> list[Chunk]:
+        chunks: list[Chunk] = []
+        start = 0
+        while start < len(text):
+            chunks.append(Chunk(start, text[start : start + self.max_chars]))
+            start += self.max_chars - self.overlap
+        return chunks
+
+    def chunk_many(self, texts: list[str]) -> list[list[Chunk]]:
+        return [self.chunk(t) for t in texts]
+
+
+class SectionTokenChunker:
+    """Splits on resume headings, then paragraphs / sentences, and packs the
+    pieces into chunks that fit the embedding model's token window."""
+
+    def __init__(self, max_tokens: int = CHUNK_MAX_TOKENS, model_name: str = EMBEDDING_MODEL):
+        self.max_tokens = max_tokens
+        self.model_name = model_name
+        self._tokenizer = None
+        self._tokenizer_loaded = False
+        self._lock = threading.Lock()
+
+    # ── token counting ────────────────────────────────────────────────────
+    def _get_tokenizer(self):
+        with self._lock:
+            if not self._tokenizer_loaded:
+                self._tokenizer_loaded = True
+                try:
+                    from transformers import AutoTokenizer
+
+                    name = self.model_name
+                    if "/" not in name:
+                        name = f"sentence-transformers/{name}"
+                    self._tokenizer = AutoTokenizer.from_pretrained(name)
+                except Exception:
+                    self._tokenizer = None  # fall back to a length estimate
+        return self._tokenizer
+
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        if not texts:
+            return []
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return [math.ceil(len(t) / 4) for t in texts]
+        # One batched (Rust-side) tokenizer call for every piece
+        encoded = tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    # ── splitting ─────────────────────────────────────────────────────────
+    @staticmethod
+    def _sections(text: str) -> list[tuple[int, int, str]]:
+        bounds = [(m.start(), m.group("name").strip().lower()) for m in _HEADING_RE.finditer(text)]
+        if not bounds or bounds[0][0] > 0:
+            bounds.insert(0, (0, ""))
+        return [
+            (start, bounds[i + 1][0] if i + 1 < len(bounds) else len(text), name)
+            for i, (start, name) in enumerate(bounds)
+        ]
+
+    @staticmethod
+    def _split(text: str, start: int, end: int, pattern: re.Pattern) -> list[tuple[int, int]]:
+        # Contiguous spans: each separator stays attached to the preceding piece
+        spans: list[tuple[int, int]] = []
+        cursor = start
+        for m in pattern.finditer(text, start, end):
+            if m.end() > cursor:
+                spans.append((cursor, m.end()))
+                cursor = m.end()
+        if cursor < end:
+            spans.append((cursor, end))
+        return spans
+
+    @staticmethod
+    def _hard_split(start: int, end: int, pieces: int, text: str) -> list[tuple[int, int]]:
+        # Last resort for a single over-long sentence: cut near even offsets on whitespace
+        spans: list[tuple[int, int]] = []
+        step = (end - start) / pieces
+        cursor = start
+        for k in range(1, pieces):
+            cut = int(start + k * step)
+            space = text.rfind(" ", cursor + 1, cut + 1)
+            cut = space + 1 if space > cursor else cut
+            spans.append((cursor, cut))
+            cursor = cut
+        spans.append((cursor, end))
+        return spans
+
+    def _units(self, text: str) -> list[tuple[int, int, str]]:
+        units: list[tuple[int, int, str]] = []
+        for sec_start, sec_end, name in self._sections(text):
+            for p_start, p_end in self._split(text, sec_start, sec_end, _PARAGRAPH_RE):
+                units.append((p_start, p_end, name))
+        return units
+
+    def _refine(self, text: str, units: list[tuple[int, int, str]], counts: list[int]):
+        # Break over-long paragraphs into sentences, then hard-split leftovers
+        out: list[tuple[int, int, str, int]] = []
+        too_long = [i for i, c in enumerate(counts) if c > self.max_tokens]
+        sentences: dict[int, list[tuple[int, int]]] = {
+            i: self._split(text, units[i][0], units[i][1], _SENTENCE_RE) for i in too_long
+        }
+        flat = [text[s:e] for i in too_long for s, e in sentences[i]]
+        flat_counts = iter(self.count_tokens(flat))
+        for i, (start, end, name) in enumerate(units):
+            if i not in sentences:
+                out.append((start, end, name, counts[i]))
+                continue
+            for s, e in sentences[i]:
+                n = next(flat_counts)
+                if n <= self.max_tokens:
+                    out.append((s, e, name, n))
+                    continue
+                pieces = math.ceil(n / self.max_tokens)
+                for hs, he in self._hard_split(s, e, pieces, text):
+                    out.append((hs, he, name, math.ceil(n / pieces)))
+        return out
+
+    def _pack(self, text: str, units: list[tuple[int, int, str, int]]) -> list[Chunk]:
+        chunks: list[Chunk] = []
+        cur_start: Optional[int] = None
+        cur_end = 0
+        cur_tokens = 0
+        cur_section = ""
+        for start, end, name, n in units:
+            if cur_start is not None and (
+                name != cur_section or cur_tokens + n > self.max_tokens
+            ):
+                chunks.append(Chunk(cur_start, text[cur_start:cur_end], cur_section))
+                cur_start = None
+            if cur_start is None:
+                cur_start, cur_tokens, cur_section = start, 0, name
+            cur_end = end
+            cur_tokens += n
+        if cur_start is not None:
+            chunks.append(Chunk(cur_start, text[cur_start:cur_end], cur_section))
+        return chunks
+
+    def chunk(self, text: str) -> list[Chunk]:
+        return self.chunk_many([text])[0]
+
+    def chunk_many(self, texts: list[str]) -> list[list[Chunk]]:
+        all_units = [self._units(t) for t in texts]
+        # Count tokens for every paragraph of every document in one batch
+        counts = iter(
+            self.count_tokens([t[s:e] for t, units in zip(texts, all_units) for s, e, _ in units])
+        )
+        results: list[list[Chunk]] = []
+        for text, units in zip(texts, all_units):
+            unit_counts = [next(counts) for _ in units]
+            results.append(self._pack(text, self._refine(text, units, unit_counts)))
+        return results
+
+
+_chunker: Chunker | None = None
+
+
+def get_chunker() -> Chunker:
+    global _chunker
+    if _chunker is None:
+        _chunker = FixedCharChunker() if CHUNKER == "fixed" else SectionTokenChunker()
+    return _chunker
@@ -8,6 +8,31 @@ load_dotenv()
 GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL: str = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 
+# LLM execution (bounded worker pool for blocking crew kickoffs)
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "180"))
+
+# Global LLM scheduler: Groq request/token budgets and 429 retry policy
+GROQ_RPM: int = int(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM: int = int(os.getenv("GROQ_TPM", "6000"))
+LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS: float = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "2"))
+
+# Evaluator sharding (resumes per LLM call, concurrent shards in flight) and
+# how many times a missing / invalid candidate is re-evaluated on its own
+EVAL_SHARD_SIZE: int = int(os.getenv("EVAL_SHARD_SIZE", "3"))
+EVAL_MAX_CONCURRENCY: int = int(os.getenv("EVAL_MAX_CONCURRENCY", "4"))
+EVAL_MAX_RETRIES: int = int(os.getenv("EVAL_MAX_RETRIES", "2"))
+
+# Writer: concurrent per-candidate email drafting calls; optionally pre-draft
+# shortlisted candidates at background priority while awaiting approval
+WRITER_MAX_CONCURRENCY: int = int(os.getenv("WRITER_MAX_CONCURRENCY", "4"))
+SPECULATIVE_DRAFTS: bool = os.getenv("SPECULATIVE_DRAFTS", "false").lower() in ("1", "true", "yes")
+
+# Per-resume token budgets for evaluator / writer prompts (0 = send full text)
+EVAL_RESUME_TOKEN_BUDGET: int = int(os.getenv("EVAL_RESUME_TOKEN_BUDGET", "1500"))
+WRITER_RESUME_TOKEN_BUDGET: int = int(os.getenv("WRITER_RESUME_TOKEN_BUDGET", "800"))
+
 # Embedding Model (local sentence-transformers)
 EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
@@ -15,11 +40,72 @@ EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 BASE_DIR = Path(__file__).resolve().parent.parent
 UPLOAD_DIR = BASE_DIR / "uploads"
 CHROMA_DIR = BASE_DIR / "chroma_db"
+CACHE_DIR = BASE_DIR / "cache"
 UPLOAD_DIR.mkdir(exist_ok=True)
 CHROMA_DIR.mkdir(exist_ok=True)
+CACHE_DIR.mkdir(exist_ok=True)
+
+# Persistent state (documents + pipeline runs) and its in-memory bounds
+STATE_DB_PATH = Path(os.getenv("STATE_DB_PATH", str(BASE_DIR / "state.sqlite3")))
+DOCUMENT_CACHE_SIZE: int = int(os.getenv("DOCUMENT_CACHE_SIZE", "256"))
+RUN_CACHE_SIZE: int = int(os.getenv("RUN_CACHE_SIZE", "100"))
+RUN_CACHE_TTL_SECONDS: float = float(os.getenv("RUN_CACHE_TTL_SECONDS", "3600"))
+
+# Content-addressed caches (extracted text by file SHA-256, embeddings by chunk hash)
+TEXT_CACHE_MAX_MB: int = int(os.getenv("TEXT_CACHE_MAX_MB", "256"))
+EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+
+# LLM response cache (keyed by model + prompt hash + schema version)
+LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_MB: int = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+# Uploads are streamed to disk in chunks and rejected past UPLOAD_MAX_MB
+UPLOAD_MAX_MB: int = int(os.getenv("UPLOAD_MAX_MB", "20"))
+UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# Ingestion (PDF extraction workers, chunks per embedding/upsert batch)
+INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 2)))
+EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+# Near-duplicate resumes (MinHash/LSH over word shingles): copies whose estimated
+# Jaccard similarity to an existing resume reaches DEDUP_THRESHOLD are linked to it
+DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS: int = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_SHINGLE_SIZE: int = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+
+# Chunking: "section" (heading/paragraph aware, token-sized) or "fixed" (2000 chars)
+CHUNKER: str = os.getenv("CHUNKER", "section")
+CHUNK_MAX_TOKENS: int = int(os.getenv("CHUNK_MAX_TOKENS", "240"))  # MiniLM window is 256
+
+# Vector store backend: "chroma" (persistent HNSW) or "numpy" (memory-mapped
+# float16/int8 embeddings, exact brute-force search)
+VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
+VECTOR_INDEX_DIR = Path(os.getenv("VECTOR_INDEX_DIR", str(BASE_DIR / "vector_index")))
+VECTOR_INDEX_DTYPE: str = os.getenv("VECTOR_INDEX_DTYPE", "float16")
+VECTOR_SEARCH_BLOCK_ROWS: int = int(os.getenv("VECTOR_SEARCH_BLOCK_ROWS", "65536"))
 
 # Vector search defaults
 DEFAULT_TOP_N: int = int(os.getenv("DEFAULT_TOP_N", "5"))
+# Per-resume score aggregation over chunk hits: "max" | "mean_top_k" | "coverage"
+RANK_STRATEGY: str = os.getenv("RANK_STRATEGY", "max")
+RANK_TOP_K: int = int(os.getenv("RANK_TOP_K", "3"))
+# Hybrid retrieval: BM25 over resume text fused with dense results (RRF)
+HYBRID_SEARCH: bool = os.getenv("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+RRF_K: int = int(os.getenv("RRF_K", "60"))
+
+# Optional CPU cross-encoder rerank between retrieval and the LLM evaluator
+RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL: str = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_POOL: int = int(os.getenv("RERANK_POOL", "50"))
+RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# Chunks per resume the cross-encoder scores (resume score = best chunk); the
+# model truncates at 512 tokens, so whole resumes would score the header only
+RERANK_CHUNKS: int = int(os.getenv("RERANK_CHUNKS", "3"))
+
+# Workspaces scope JDs and pipeline runs; the resume pool is shared
+DEFAULT_WORKSPACE: str = os.getenv("DEFAULT_WORKSPACE", "default")
 
 # CORS
 FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import math
+import re
+
+import numpy as np
+
+from app.models import JDAnalysis
+from app.vector_store import embed_texts, get_resume_chunks, rebuild_text
+
+# Sections that rarely help an evaluator or copywriter
+BOILERPLATE_SECTIONS = {"references", "hobbies", "interests", "declaration", "personal details"}
+_BOILERPLATE_LINE_RE = re.compile(
+    r"^\s*(references\s+(are\s+)?available\s+(up)?on\s+request"
+    r"|i\s+hereby\s+declare.*"
+    r"|declaration\s*:?.*"
+    r"|page\s+\d+(\s+of\s+\d+)?)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose (Llama / MiniLM tokenizers)
+    return math.ceil(len(text) / 4)
+
+
+def requirements_query(jd_analysis: JDAnalysis) -> str:
+    parts = [
+        jd_analysis.role_title,
+        jd_analysis.summary,
+        *jd_analysis.technical_requirements,
+        *jd_analysis.education_requirements,
+        *jd_analysis.nice_to_haves,
+    ]
+    return "\n".join(p for p in parts if p)
+
+
+def _strip_boilerplate(text: str) -> str:
+    return re.sub(r"\n{3,}", "\n\n", _BOILERPLATE_LINE_RE.sub("", text)).strip()
+
+
+def _stitch(chunks: list[dict]) -> str:
+    # Contiguous chunks are merged without their overlap; gaps are marked
+    runs: list[list[dict]] = []
+    for chunk in chunks:
+        idx = chunk["metadata"].get("chunk_index", 0)
+        if runs and runs[-1][-1]["metadata"].get("chunk_index", 0) == idx - 1:
+            runs[-1].append(chunk)
+        else:
+            runs.append([chunk])
+    return "\n[…]\n".join(rebuild_text([(c["metadata"], c["text"]) for c in run]) for run in runs)
+
+
+def compress_resume(chunks: list[dict], query_vec: np.ndarray, budget_tokens: int) -> str:
+    """Keep the chunks most similar to the JD requirements within a token budget."""
+    full = _strip_boilerplate(rebuild_text([(c["metadata"], c["text"]) for c in chunks]))
+    if estimate_tokens(full) <= budget_tokens:
+        return full
+
+    candidates = [
+        c for c in chunks if c["metadata"].get("section", "").lower() not in BOILERPLATE_SECTIONS
+    ] or chunks
+    vectors = np.asarray([c["embedding"] for c in candidates], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query_vec) or 1.0)
+    scores = vectors @ query_vec / np.where(norms == 0, 1.0, norms)
+
+    # The first chunk carries the name and contact header → always keep it
+    order = [0] + [i for i in np.argsort(-scores).tolist() if i != 0]
+    selected: list[dict] = []
+    used = 0
+    for i in order:
+        cost = estimate_tokens(candidates[i]["text"])
+        if used + cost > budget_tokens and selected:
+            continue
+        selected.append(candidates[i])
+        used += cost
+
+    selected.sort(key=lambda c: c["metadata"].get("chunk_index", 0))
+    text = _strip_boilerplate(_stitch(selected))
+    # A single oversized chunk can still exceed the budget
+    return text[: budget_tokens * 4]
+
+
+def compress_resumes(
+    resumes: list[dict],
+    jd_analysis: JDAnalysis,
+    budget_tokens: int,
+) -> list[dict]:
+    """Return copies of ``resumes`` whose text fits ``budget_tokens`` each (blocking)."""
+    if budget_tokens <= 0 or not resumes:
+        return resumes
+    over = [r for r in resumes if estimate_tokens(r["text"]) > budget_tokens]
+    if not over:
+        return resumes
+
+    query_vec = np.asarray(embed_texts([requirements_query(jd_analysis)])[0], dtype=np.float32)
+    stored = get_resume_chunks([r["resume_id"] for r in over])
+    compressed: list[dict] = []
+    for r in resumes:
+        chunks = stored.get(r["resume_id"])
+        if chunks and estimate_tokens(r["text"]) > budget_tokens:
+            r = {**r, "text": compress_resume(chunks, query_vec, budget_tokens)}
+        compressed.append(r)
+    return compressed
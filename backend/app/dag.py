@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+# A stage receives the results of its dependencies, keyed by stage name
+StageFn = Callable[[dict[str, Any]], Awaitable[Any]]
+Stages = dict[str, tuple[tuple[str, ...], StageFn]]
+
+
+def _check_acyclic(stages: Stages) -> None:
+    state: dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(name: str) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"Dependency cycle at stage '{name}'")
+        if name not in stages:
+            raise ValueError(f"Unknown stage '{name}'")
+        state[name] = 1
+        for dep in stages[name][0]:
+            visit(dep)
+        state[name] = 2
+
+    for name in stages:
+        visit(name)
+
+
+async def run_dag(
+    stages: Stages,
+    timings: Optional[dict[str, float]] = None,
+) -> dict[str, Any]:
+    """Run each stage as soon as its dependencies finish; independent stages overlap.
+
+    ``timings`` (if given) receives each stage's own wall time in seconds.
+    The first failing stage cancels the rest and its exception propagates.
+    """
+    _check_acyclic(stages)
+    results: dict[str, Any] = {}
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def _run(name: str) -> None:
+        deps, fn = stages[name]
+        for dep in deps:
+            await tasks[dep]
+        start = time.perf_counter()
+        results[name] = await fn({dep: results[dep] for dep in deps})
+        if timings is not None:
+            timings[name] = round(time.perf_counter() - start, 3)
+
+    tasks = {name: asyncio.create_task(_run(name)) for name in stages}
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return results
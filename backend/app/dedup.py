@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.config import (
+    DEDUP_BANDS,
+    DEDUP_ENABLED,
+    DEDUP_NUM_PERM,
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_THRESHOLD,
+    STATE_DB_PATH,
+)
+from app.models import DocumentMeta
+from app.store import _connect
+
+_TOKEN_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+# ── MinHash ───────────────────────────────────────────────────────────────────
+
+def _permutations(num_perm: int) -> tuple[np.ndarray, np.ndarray]:
+    # Fixed seed: signatures are persisted and must stay comparable across runs
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations(DEDUP_NUM_PERM)
+
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_SIZE) -> set[str]:
+    """Word n-grams of the lower-cased text (layout/punctuation edits don't matter)."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(text: str) -> np.ndarray:
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return np.full(DEDUP_NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    # Stable 32-bit shingle hashes (Python's hash() is salted per process)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingle_set),
+        dtype=np.uint64,
+        count=len(shingle_set),
+    )
+    # Universal hashing, all permutations × all shingles in one pass
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=1)
+
+
+def jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+# ── LSH index over canonical resumes ─────────────────────────────────────────
+
+class NearDuplicateIndex:
+    """Banded LSH over MinHash signatures of canonical resumes.
+
+    Signatures are persisted in the state database and loaded on first use;
+    only canonical resumes are indexed, so every match is a canonical id.
+    """
+
+    def __init__(self, path: Path, bands: int = DEDUP_BANDS, threshold: float = DEDUP_THRESHOLD):
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._bands = max(1, min(bands, DEDUP_NUM_PERM))
+        self._rows = DEDUP_NUM_PERM // self._bands
+        self._threshold = threshold
+        self._signatures: Optional[dict[str, np.ndarray]] = None
+        self._buckets: dict[tuple[int, bytes], list[str]] = defaultdict(list)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resume_minhash (doc_id TEXT PRIMARY KEY, signature BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _band_keys(self, sig: np.ndarray) -> list[tuple[int, bytes]]:
+        return [
+            (band, sig[band * self._rows : (band + 1) * self._rows].tobytes())
+            for band in range(self._bands)
+        ]
+
+    def _index(self, doc_id: str, sig: np.ndarray) -> None:
+        self._signatures[doc_id] = sig
+        for key in self._band_keys(sig):
+            self._buckets[key].append(doc_id)
+
+    def _load(self) -> None:
+        if self._signatures is not None:
+            return
+        self._signatures = {}
+        for row in self._conn.execute("SELECT doc_id, signature FROM resume_minhash"):
+            sig = np.frombuffer(row["signature"], dtype=np.uint64)
+            if len(sig) == DEDUP_NUM_PERM:  # skip signatures from another DEDUP_NUM_PERM
+                self._index(row["doc_id"], sig)
+
+    def find_or_add(self, doc_id: str, text: str) -> Optional[str]:
+        """Return the canonical id ``text`` near-duplicates, else index it as canonical."""
+        sig = minhash(text)
+        with self._lock:
+            self._load()
+            candidates = {c for key in self._band_keys(sig) for c in self._buckets.get(key, ())}
+            best, best_score = None, self._threshold
+            for cand in candidates:
+                score = jaccard(sig, self._signatures[cand])
+                if score >= best_score:
+                    best, best_score = cand, score
+            if best is not None:
+                return best
+            self._index(doc_id, sig)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resume_minhash (doc_id, signature) VALUES (?, ?)",
+                (doc_id, sig.tobytes()),
+            )
+            self._conn.commit()
+            return None
+
+    def remove(self, doc_ids: list[str]) -> None:
+        drop = set(doc_ids)
+        with self._lock:
+            self._load()
+            for doc_id in drop:
+                sig = self._signatures.pop(doc_id, None)
+                if sig is None:
+                    continue
+                for key in self._band_keys(sig):
+                    bucket = self._buckets.get(key)
+                    if bucket and doc_id in bucket:
+                        bucket.remove(doc_id)
+            self._conn.executemany("DELETE FROM resume_minhash WHERE doc_id = ?", [(d,) for d in drop])
+            self._conn.commit()
+
+    def prune_orphans(self) -> int:
+        """Drop signatures whose resume never made it into the documents table
+        (e.g. a bulk ingest killed between linking and storing a batch)."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM resume_minhash WHERE doc_id NOT IN (SELECT id FROM documents)"
+            )
+            self._conn.commit()
+            if cur.rowcount:
+                # Rebuild the buckets from what's left on next use
+                self._signatures = None
+                self._buckets.clear()
+            return cur.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM resume_minhash")
+            self._conn.commit()
+            self._signatures = {}
+            self._buckets.clear()
+
+
+_near_duplicates: NearDuplicateIndex | None = None
+
+
+def get_index() -> NearDuplicateIndex:
+    global _near_duplicates
+    if _near_duplicates is None:
+        _near_duplicates = NearDuplicateIndex(STATE_DB_PATH)
+    return _near_duplicates
+
+
+def link_duplicates(metas: list[DocumentMeta]) -> list[DocumentMeta]:
+    """Set ``duplicate_of`` on near-duplicate resumes; returns the ones to embed."""
+    if not DEDUP_ENABLED:
+        return metas
+    index = get_index()
+    fresh: list[DocumentMeta] = []
+    # Sequential so copies within the same batch also find each other
+    for meta in metas:
+        meta.duplicate_of = index.find_or_add(meta.id, meta.text)
+        if meta.duplicate_of is None:
+            fresh.append(meta)
+    return fresh
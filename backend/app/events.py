@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# Per-run pub/sub for pipeline progress, consumed by the SSE endpoint.
+# Each subscriber gets its own queue; publishing never blocks the pipeline.
+_subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+
+def publish(run_id: str, event: str, data: Any) -> None:
+    for queue in list(_subscribers.get(run_id, ())):
+        queue.put_nowait((event, data))
+
+
+@contextmanager
+def subscribe(run_id: str) -> Iterator[asyncio.Queue]:
+    queue: asyncio.Queue = asyncio.Queue()
+    _subscribers[run_id].add(queue)
+    try:
+        yield queue
+    finally:
+        _subscribers[run_id].discard(queue)
+        if not _subscribers[run_id]:
+            _subscribers.pop(run_id, None)
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
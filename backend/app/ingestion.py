@@ -1,54 +1,156 @@
 from __future__ import annotations
 
-import shutil
+import asyncio
+import hashlib
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import BinaryIO
+from typing import Awaitable, Protocol, Union
 
 import fitz  # PyMuPDF
 
-from app.config import UPLOAD_DIR
+from app.cache import get_text_cache
+from app.config import INGEST_WORKERS, UPLOAD_CHUNK_BYTES, UPLOAD_DIR, UPLOAD_MAX_MB
 from app.models import DocumentMeta
 
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    doc = fitz.open(stream=file_bytes, filetype="pdf")
-    pages: list[str] = []
-    for page in doc:
-        pages.append(page.get_text("text"))
-    doc.close()
-    return "\n".join(pages).strip()
+class AsyncReadable(Protocol):
+    """Anything with ``await read(size)`` – e.g. FastAPI's ``UploadFile``."""
 
+    def read(self, size: int = -1) -> Awaitable[bytes]: ...
 
-def extract_text_from_txt(file_bytes: bytes) -> str:
-    return file_bytes.decode("utf-8", errors="replace").strip()
 
+class UploadTooLargeError(ValueError):
+    pass
 
-async def save_and_extract(
-    file: BinaryIO,
-    filename: str,
-    doc_type: str,
-) -> DocumentMeta:
-    file_bytes = file if isinstance(file, bytes) else file.read()
+# Process pool for CPU-bound PDF parsing (kept off the event loop)
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=INGEST_WORKERS)
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def extract_text_from_pdf(path: Path) -> str:
+    # Opened from disk, PyMuPDF loads pages lazily: one page resident at a time
+    pages: list[str] = []
+    with fitz.open(path) as doc:
+        for page in doc:
+            pages.append(page.get_text("text"))
+    return "\n".join(pages).strip()
+
+
+def extract_text_from_txt(path: Path) -> str:
+    return path.read_bytes().decode("utf-8", errors="replace").strip()
 
-    # Persist raw file
-    dest = UPLOAD_DIR / filename
-    dest.write_bytes(file_bytes)
 
-    # Extract text based on extension
+def extract_text(path: str | Path, filename: str) -> str:
+    # Extract text based on extension (top-level so it can run in the pool)
+    path = Path(path)
     suffix = Path(filename).suffix.lower()
     if suffix == ".pdf":
-        text = extract_text_from_pdf(file_bytes)
+        text = extract_text_from_pdf(path)
     elif suffix in (".txt", ".text", ".md"):
-        text = extract_text_from_txt(file_bytes)
+        text = extract_text_from_txt(path)
     else:
         raise ValueError(f"Unsupported file type: {suffix}")
 
     if not text:
         raise ValueError(f"No text could be extracted from {filename}")
+    return text
+
+
+async def _receive(source: Union[bytes, AsyncReadable], dest: Path) -> tuple[Path, str]:
+    """Stream ``source`` into a private temp file next to ``dest`` in fixed-size
+    chunks, enforcing UPLOAD_MAX_MB; returns the temp path and the SHA-256."""
+    limit = UPLOAD_MAX_MB * 1024 * 1024
+    digest = hashlib.sha256()
+    size = 0
+    # Unique name: a rejected/partial upload never replaces a file, and
+    # concurrent uploads with the same filename never share a path
+    tmp = dest.with_name(f".{uuid.uuid4().hex}.part")
+    out = await asyncio.to_thread(open, tmp, "wb")
+    try:
+        offset = 0
+        while True:
+            if isinstance(source, (bytes, bytearray)):
+                chunk = source[offset : offset + UPLOAD_CHUNK_BYTES]
+                offset += len(chunk)
+            else:
+                chunk = await source.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                raise UploadTooLargeError(f"{dest.name} exceeds the {UPLOAD_MAX_MB} MB upload limit")
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        out.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    out.close()
+    return tmp, digest.hexdigest()
+
+
+async def save_upload(source: Union[bytes, AsyncReadable], dest: Path) -> str:
+    """Write ``source`` to ``dest`` in fixed-size chunks, enforcing
+    UPLOAD_MAX_MB; returns the SHA-256 of the content."""
+    tmp, digest = await _receive(source, dest)
+    await asyncio.to_thread(os.replace, tmp, dest)
+    return digest
+
+
+async def save_and_extract(
+    file: Union[bytes, AsyncReadable],
+    filename: str,
+    doc_type: str,
+) -> DocumentMeta:
+    # Persist raw file (streamed; never held in memory as a whole)
+    filename = Path(filename).name
+    dest = UPLOAD_DIR / filename
+    tmp, digest = await _receive(file, dest)
+
+    try:
+        # Known file → cached text; otherwise parse this upload's private temp
+        # copy (the shared dest path may be overwritten by a same-named upload)
+        cache = get_text_cache()
+        cached = await asyncio.to_thread(cache.get, digest)
+        if cached is not None:
+            text = cached.decode("utf-8")
+        else:
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(_get_pool(), extract_text, str(tmp), filename)
+            await asyncio.to_thread(cache.put, digest, text.encode("utf-8"))
+    finally:
+        await asyncio.to_thread(os.replace, tmp, dest)
 
     meta = DocumentMeta(
         filename=filename,
         doc_type=doc_type,
         text=text,
+        sha256=digest,
     )
     return meta
+
+
+async def save_and_extract_many(
+    files: list[tuple[str, Union[bytes, AsyncReadable]]],
+    doc_type: str,
+) -> list[DocumentMeta | Exception]:
+    """Extract many files concurrently; failures are returned, not raised."""
+    return await asyncio.gather(
+        *(save_and_extract(data, name, doc_type) for name, data in files),
+        return_exceptions=True,
+    )
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from crewai import Crew
+
+from app.cache import BlobCache, sha256_hex
+from app.config import CACHE_DIR, LLM_CACHE_ENABLED, LLM_CACHE_MAX_MB
+
+# Persistent cache of raw LLM outputs keyed by model + schema version + prompt
+_cache: BlobCache | None = None
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+
+
+def _get_cache() -> BlobCache:
+    global _cache
+    if _cache is None:
+        _cache = BlobCache(CACHE_DIR / "llm.sqlite3", LLM_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
+
+
+def _count(stat: str) -> None:
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def render_prompt(crew: Crew) -> str:
+    """Everything that shapes the LLM request: agent personas + task prompts."""
+    parts: list[str] = []
+    for agent in crew.agents:
+        parts += [agent.role, agent.goal, agent.backstory]
+    for task in crew.tasks:
+        parts += [task.description, task.expected_output]
+    return "\n\x1e".join(parts)
+
+
+def make_key(model: str, schema_version: str, crew: Crew) -> str:
+    return sha256_hex(f"{model}\n{schema_version}\n{render_prompt(crew)}")
+
+
+def get(key: str, bypass: bool = False) -> Optional[str]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    if bypass:
+        _count("bypassed")
+        return None
+    value = _get_cache().get(key)
+    _count("hits" if value is not None else "misses")
+    return value.decode("utf-8") if value is not None else None
+
+
+def put(key: str, raw: str) -> None:
+    if not LLM_CACHE_ENABLED:
+        return
+    _get_cache().put(key, raw.encode("utf-8"))
+    _count("stores")
+
+
+def stats() -> dict:
+    with _stats_lock:
+        snapshot = dict(_stats)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_rate"] = round(snapshot["hits"] / lookups, 4) if lookups else 0.0
+    snapshot["enabled"] = LLM_CACHE_ENABLED
+    return snapshot
+
+
+def clear() -> None:
+    _get_cache().clear()
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Iterator, Optional
+
+from app.config import (
+    GROQ_RPM,
+    GROQ_TPM,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_TIMEOUT_SECONDS,
+)
+
+if TYPE_CHECKING:
+    from crewai import Crew
+
+# Dedicated, bounded pool for blocking crew.kickoff() calls so that an
+# in-flight LLM request never stalls the FastAPI event loop.
+_executor: ThreadPoolExecutor | None = None
+
+# Job the current LLM calls belong to (inherited by child tasks), so the
+# queued calls of e.g. one speculative draft can be promoted together
+_current_job: ContextVar[Optional[Hashable]] = ContextVar("llm_job", default=None)
+
+
+class Priority(IntEnum):
+    # Lower value is served first
+    INTERACTIVE = 0  # writer calls a human is waiting on
+    NORMAL = 1  # researcher
+    BULK = 2  # evaluator shards
+    BACKGROUND = 3  # speculative work
+
+
+class TokenBucket:
+    """Continuously refilling budget of ``per_minute`` units."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        # Requests larger than the whole bucket go through once it is full
+        need = min(amount, self.capacity)
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount  # may go negative; later callers then wait longer
+
+
+class LLMScheduler:
+    """Process-wide gate for LLM calls: concurrency slots, request/token
+    buckets and priority ordering, with jittered retries on rate limits."""
+
+    def __init__(self, max_concurrency: int, rpm: int, tpm: int):
+        self.max_concurrency = max_concurrency
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._heap: list[tuple[int, int, float, asyncio.Future, Optional[Hashable]]] = []
+        self._seq = itertools.count()
+        self._promoted: dict[Hashable, Priority] = {}
+        self._running = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stats = {
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "total_wait_seconds": 0.0,
+        }
+
+    # ── slot management ───────────────────────────────────────────────────
+    def _pump(self) -> None:
+        self._timer = None
+        while self._heap and self._running < self.max_concurrency:
+            _, _, amount, future, _ = self._heap[0]
+            if future.done():  # waiter was cancelled
+                heapq.heappop(self._heap)
+                continue
+            delay = max(self._requests.wait_time(1), self._tokens.wait_time(amount))
+            if delay > 0:
+                # Head of line waits for budget; lower priorities wait behind it
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+            heapq.heappop(self._heap)
+            self._requests.consume(1)
+            self._tokens.consume(amount)
+            self._running += 1
+            future.set_result(None)
+
+    async def _acquire(self, priority: Priority, tokens: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        job = _current_job.get()
+        if job in self._promoted:
+            priority = min(priority, self._promoted[job])
+        heapq.heappush(self._heap, (int(priority), next(self._seq), float(tokens), future, job))
+        if self._timer is None:
+            self._pump()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # slot was granted just before cancellation
+            raise
+
+    def _release(self) -> None:
+        self._running -= 1
+        if self._timer is None:
+            self._pump()
+
+    # ── jobs ──────────────────────────────────────────────────────────────
+    @contextmanager
+    def job(self, key: Hashable) -> Iterator[None]:
+        """Tag the LLM calls made inside this block (and its child tasks) as ``key``."""
+        token = _current_job.set(key)
+        try:
+            yield
+        finally:
+            _current_job.reset(token)
+            self._promoted.pop(key, None)
+
+    def promote(self, key: Hashable, priority: Priority) -> None:
+        """Raise the priority of job ``key``'s queued and future calls."""
+        self._promoted[key] = min(priority, self._promoted.get(key, priority))
+        changed = False
+        for i, (prio, seq, amount, future, job) in enumerate(self._heap):
+            if job == key and prio > priority:
+                self._heap[i] = (int(priority), seq, amount, future, job)
+                changed = True
+        if changed:
+            heapq.heapify(self._heap)
+            if self._timer is None:
+                self._pump()
+
+    def record_usage(self, estimated: int, actual: Optional[int]) -> None:
+        if actual is not None and actual > estimated:
+            self._tokens.consume(actual - estimated)
+
+    # ── public API ────────────────────────────────────────────────────────
+    async def run(
+        self,
+        crew: Crew,
+        priority: Priority = Priority.NORMAL,
+        estimated_tokens: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        limit = timeout if timeout is not None else LLM_TIMEOUT_SECONDS
+        attempt = 0
+        while True:
+            queued_at = time.monotonic()
+            await self._acquire(priority, estimated_tokens)
+            self._stats["total_wait_seconds"] += time.monotonic() - queued_at
+            try:
+                # The slot is freed when the worker thread finishes, not when we
+                # stop waiting: a timed-out/cancelled call still occupies a thread
+                result = await _execute(crew, limit, on_finished=self._release)
+            except Exception as exc:
+                if not _is_rate_limit(exc) or attempt >= LLM_MAX_RETRIES:
+                    self._stats["failed"] += 1
+                    raise
+                self._stats["rate_limited"] += 1
+                self._stats["retries"] += 1
+                attempt += 1
+                backoff = random.uniform(0, LLM_BACKOFF_BASE_SECONDS * 2**attempt)
+            else:
+                self._stats["completed"] += 1
+                usage = getattr(result, "token_usage", None)
+                self.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
+                return result
+            # Back off outside the slot so other calls can proceed
+            await asyncio.sleep(backoff)
+
+    def stats(self) -> dict:
+        depth: dict[str, int] = {p.name.lower(): 0 for p in Priority}
+        for prio, _, _, future, _ in self._heap:
+            if not future.done():
+                depth[Priority(prio).name.lower()] += 1
+        return {
+            **self._stats,
+            "total_wait_seconds": round(self._stats["total_wait_seconds"], 3),
+            "running": self._running,
+            "queue_depth": depth,
+            "request_budget": round(self._requests.tokens, 1),
+            "token_budget": round(self._tokens.tokens, 1),
+        }
+
+
+def _is_rate_limit(exc: BaseException) -> bool:
+    text = f"{type(exc).__name__} {exc}".lower()
+    return "ratelimit" in text or "rate limit" in text or "429" in text
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=LLM_MAX_CONCURRENCY,
+            thread_name_prefix="llm",
+        )
+    return _executor
+
+
+def _notify(loop: asyncio.AbstractEventLoop, callback: Callable[[], None]) -> None:
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass  # loop already closed (shutdown)
+
+
+async def _execute(
+    crew: Crew,
+    limit: float,
+    on_finished: Optional[Callable[[], None]] = None,
+) -> Any:
+    """Run ``crew.kickoff`` in the LLM pool. ``on_finished`` is called on the
+    loop once the worker is really done (or the job was dropped unstarted)."""
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+
+    def job() -> Any:
+        _notify(loop, started.set)
+        return crew.kickoff()
+
+    try:
+        job_future = _get_executor().submit(job)
+    except BaseException:
+        if on_finished is not None:
+            on_finished()
+        raise
+    if on_finished is not None:
+        job_future.add_done_callback(lambda _: _notify(loop, on_finished))
+    future = asyncio.wrap_future(job_future, loop=loop)
+    # Retrieve the outcome even when nobody awaits it any more
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    try:
+        # The timeout covers the call itself, not the wait for a free worker
+        await started.wait()
+        return await asyncio.wait_for(asyncio.shield(future), timeout=limit)
+    except asyncio.TimeoutError as exc:
+        # The worker thread cannot be interrupted; it finishes in the
+        # background and its result is discarded.
+        raise TimeoutError(f"LLM call exceeded {limit:.0f}s timeout") from exc
+    except asyncio.CancelledError:
+        job_future.cancel()  # only succeeds if no worker has picked it up yet
+        raise
+
+
+_scheduler: LLMScheduler | None = None
+
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(LLM_MAX_CONCURRENCY, GROQ_RPM, GROQ_TPM)
+    return _scheduler
+
+
+async def kickoff(
+    crew: Crew,
+    timeout: float | None = None,
+    priority: Priority = Priority.NORMAL,
+    estimated_tokens: int = 0,
+) -> Any:
+    """Run ``crew.kickoff()`` through the global scheduler and LLM pool."""
+    return await get_scheduler().run(crew, priority, estimated_tokens, timeout)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
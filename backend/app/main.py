@@ -3,37 +3,88 @@ from __future__ import annotations
 import asyncio
 import logging
 from contextlib import asynccontextmanager
-from typing import Dict
+from typing import Optional
 
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
+from app import events, llm_cache
 from app.agents import run_evaluator, run_researcher, run_writer
-from app.config import DEFAULT_TOP_N, FRONTEND_URL
-from app.ingestion import save_and_extract
+from app.config import (
+    DEFAULT_TOP_N,
+    DEFAULT_WORKSPACE,
+    DOCUMENT_CACHE_SIZE,
+    EVAL_RESUME_TOKEN_BUDGET,
+    FRONTEND_URL,
+    HYBRID_SEARCH,
+    RERANK_ENABLED,
+    RERANK_CHUNKS,
+    RERANK_POOL,
+    RUN_CACHE_SIZE,
+    RUN_CACHE_TTL_SECONDS,
+    SPECULATIVE_DRAFTS,
+    STATE_DB_PATH,
+    WRITER_RESUME_TOKEN_BUDGET,
+)
+from app.context import compress_resumes
+from app.dag import run_dag
+from app.dedup import get_index as get_dedup_index
+from app.dedup import link_duplicates
+from app.ingestion import UploadTooLargeError, save_and_extract, save_and_extract_many
+from app.ingestion import shutdown as shutdown_ingestion
+from app.llm_runtime import Priority, get_scheduler
+from app.llm_runtime import shutdown as shutdown_llm_runtime
 from app.models import (
+    ACTIVE_STATUSES,
+    AddResumesRequest,
     ApproveShortlistRequest,
     CandidateEvaluation,
+    CandidateFailure,
+    CandidateScore,
     DocumentMeta,
     EditEmailRequest,
+    JDAnalysis,
+    JDMatchResult,
+    MatchJDsRequest,
+    OutreachEmail,
     PipelineRun,
     PipelineRunResponse,
     PipelineStatus,
+    ResumeUploadResult,
     StartPipelineRequest,
 )
-from app.vector_store import add_resume, get_full_resume_text, query_resumes, reset_collection
+from app.reranker import build_query, rerank
+from app.store import DocumentStore, RunStore
+from app.vector_store import (
+    add_resumes,
+    best_chunks,
+    delete_resumes,
+    dense_search,
+    fuse_keyword_hits,
+    get_full_resume_texts,
+    match_many,
+    reset_collection,
+)
 
 logger = logging.getLogger("recruitment_orchestrator")
 
-# ── In-memory stores (swap for a real DB in production) ───────────────────────
-documents: Dict[str, DocumentMeta] = {}
-pipeline_runs: Dict[str, PipelineRun] = {}
+# ── Persistent stores (SQLite, bounded in-memory caches) ──────────────────────
+documents = DocumentStore(STATE_DB_PATH, cache_size=DOCUMENT_CACHE_SIZE)
+pipeline_runs = RunStore(STATE_DB_PATH, cache_size=RUN_CACHE_SIZE, ttl_seconds=RUN_CACHE_TTL_SECONDS)
+
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# In-flight speculative drafts: run_id → resume_id → task
+_draft_tasks: dict[str, dict[str, asyncio.Task]] = {}
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("🟢 Recruitment Orchestrator starting …")
     yield
+    shutdown_llm_runtime()
+    shutdown_ingestion()
     logger.info("🔴 Recruitment Orchestrator shutting down …")
 
 
@@ -55,34 +106,63 @@ app.add_middleware(
 #  UPLOAD ENDPOINTS
 
 @app.post("/api/upload/jd", response_model=DocumentMeta)
-async def upload_jd(file: UploadFile = File(...)):
-    # Purge previous session state
-    documents.clear()
-    pipeline_runs.clear()
-    reset_collection()
-
-    file_bytes = await file.read()
-    meta = await save_and_extract(file_bytes, file.filename, doc_type="jd")
-    documents[meta.id] = meta
+async def upload_jd(file: UploadFile = File(...), workspace_id: str = DEFAULT_WORKSPACE):
+    # The resume pool and its embeddings are kept; the JD is workspace-scoped
+    try:
+        meta = await save_and_extract(file, file.filename, doc_type="jd")
+    except UploadTooLargeError as exc:
+        raise HTTPException(413, str(exc))
+    meta.workspace_id = workspace_id
+    documents.put(meta)
     return meta
 
 
-@app.post("/api/upload/resumes", response_model=list[DocumentMeta])
+@app.post("/api/upload/resumes", response_model=list[ResumeUploadResult])
 async def upload_resumes(files: list[UploadFile] = File(...)):
-    results: list[DocumentMeta] = []
-    for f in files:
-        file_bytes = await f.read()
-        meta = await save_and_extract(file_bytes, f.filename, doc_type="resume")
-        documents[meta.id] = meta
-        # Store embedding in vector DB
-        add_resume(resume_id=meta.id, filename=meta.filename, text=meta.text)
-        results.append(meta)
+    payloads = [(f.filename, f) for f in files]
+    # Stream each upload to disk and extract it in the process pool; one bad
+    # or oversized PDF doesn't abort the batch
+    extracted = await save_and_extract_many(payloads, doc_type="resume")
+
+    results: list[ResumeUploadResult] = []
+    metas: list[DocumentMeta] = []
+    for (filename, _), outcome in zip(payloads, extracted):
+        if isinstance(outcome, BaseException):
+            logger.warning(f"Failed to ingest {filename}: {outcome}")
+            results.append(ResumeUploadResult(filename=filename, error=str(outcome)))
+            continue
+        metas.append(outcome)
+        results.append(ResumeUploadResult(filename=filename, document=outcome))
+
+    # Near-duplicates are linked to their canonical resume and never embedded
+    if metas:
+        fresh = await asyncio.to_thread(link_duplicates, metas)
+        # Embed + upsert every chunk of the batch together, off the event loop
+        try:
+            if fresh:
+                await asyncio.to_thread(
+                    add_resumes, [(m.id, m.filename, m.text) for m in fresh]
+                )
+        except Exception as exc:
+            logger.exception("Failed to index resume batch")
+            # Earlier embedding batches may already be in the vector store
+            await asyncio.to_thread(delete_resumes, [m.id for m in fresh])
+            await asyncio.to_thread(get_dedup_index().remove, [m.id for m in fresh])
+            for r in results:
+                if r.document is not None:
+                    r.document, r.error = None, f"Indexing failed: {exc}"
+            return results
+        documents.put_many(metas)
     return results
 
 
 @app.get("/api/documents", response_model=list[DocumentMeta])
-async def list_documents():
-    return list(documents.values())
+async def list_documents(workspace_id: Optional[str] = None, include_text: bool = False):
+    # Resumes are shared; JDs are filtered to the workspace when one is given.
+    # Full texts are only loaded on request.
+    return documents.list("resume", include_text=include_text) + documents.list(
+        "jd", workspace_id=workspace_id, include_text=include_text
+    )
 
 
 #  PIPELINE ENDPOINTS
@@ -93,62 +173,343 @@ async def start_pipeline(req: StartPipelineRequest):
     if not jd or jd.doc_type != "jd":
         raise HTTPException(404, "JD not found")
 
-    # Clamp top_n to the number of resumes in this session
-    resume_count = sum(1 for d in documents.values() if d.doc_type == "resume")
+    # Near-duplicates are searched as their canonical resume
+    resume_ids = _canonical_resume_ids(req.resume_ids) if req.resume_ids else None
+
+    # Clamp top_n to the number of resumes being searched
+    if resume_ids:
+        resume_count = len(resume_ids)
+    else:
+        resume_count = documents.count("resume", canonical_only=True)
     if resume_count == 0:
         raise HTTPException(400, "No resumes uploaded yet")
     effective_top_n = min(req.top_n, resume_count)
 
-    run = PipelineRun(jd_id=req.jd_id, jd_text=jd.text)
-    pipeline_runs[run.run_id] = run
+    run = _launch_pipeline(jd, req, effective_top_n, resume_ids)
+    return _to_response(run)
+
 
-    # Launch the pipeline asynchronously so the endpoint returns immediately
-    asyncio.create_task(_run_pipeline(run, effective_top_n))
+def _launch_pipeline(
+    jd: DocumentMeta,
+    req: StartPipelineRequest | MatchJDsRequest,
+    top_n: int,
+    resume_ids: Optional[list[str]] = None,
+    retrieved: Optional[list[dict]] = None,
+) -> PipelineRun:
+    run = PipelineRun(
+        workspace_id=jd.workspace_id or DEFAULT_WORKSPACE,
+        jd_id=jd.id,
+        jd_text=jd.text,
+        use_llm_cache=not req.bypass_cache,
+        speculative_drafts=(
+            SPECULATIVE_DRAFTS if req.speculative_drafts is None else req.speculative_drafts
+        ),
+    )
+    pipeline_runs.save(run)
 
-    return _to_response(run)
+    # Launch the pipeline asynchronously so the endpoint returns immediately
+    use_rerank = RERANK_ENABLED if req.rerank is None else req.rerank
+    asyncio.create_task(
+        _run_pipeline(run, top_n, req.shard_size, resume_ids, use_rerank, retrieved)
+    )
+    return run
+
+
+def _retrieval_depth(top_n: int, use_rerank: bool) -> tuple[int, int]:
+    # With rerank on, retrieve a wider pool for the cross-encoder to cut down
+    pool = max(top_n, RERANK_POOL) if use_rerank else top_n
+    # Hybrid fusion draws from a wider dense list than the final pool
+    dense_n = pool * 2 if HYBRID_SEARCH else pool
+    return pool, dense_n
+
+
+async def _run_pipeline(
+    run: PipelineRun,
+    top_n: int,
+    shard_size: Optional[int] = None,
+    resume_ids: Optional[list[str]] = None,
+    use_rerank: bool = False,
+    retrieved: Optional[list[dict]] = None,
+):
+    pool, dense_n = _retrieval_depth(top_n, use_rerank)
+
+    # ── Researcher ────────────────────────────────────────────────────────
+    async def research(_: dict) -> JDAnalysis:
+        jd_analysis = await run_researcher(
+            run.jd_text, use_cache=run.use_llm_cache, usage=run.llm_calls
+        )
+        _set_jd_analysis(run, jd_analysis)
+        logger.info(f"[{run.run_id}] Researcher complete")
+        return jd_analysis
+
+    # ── Vector search (raw JD text only → overlaps the Researcher) ────────
+    async def retrieve(_: dict) -> list[dict]:
+        # A batched multi-JD match may already have ranked the pool for this JD
+        hits = retrieved
+        if hits is None:
+            hits = await asyncio.to_thread(dense_search, run.jd_text, dense_n, resume_ids)
+        if not hits:
+            raise LookupError("No resumes found in the vector store.")
+        return hits[:dense_n]
+
+    # ── Reassemble full text for each retrieved resume ────────────────────
+    async def load_texts(deps: dict) -> dict[str, str]:
+        return await asyncio.to_thread(
+            _load_resume_texts, [r["resume_id"] for r in deps["retrieve"]]
+        )
+
+    # ── Keyword fusion + optional cross-encoder rerank ────────────────────
+    async def rank(deps: dict) -> list[dict]:
+        jd_analysis: JDAnalysis = deps["research"]
+        retrieved: list[dict] = deps["retrieve"]
+        if HYBRID_SEARCH:
+            query = " ".join([run.jd_text, *jd_analysis.technical_requirements])
+            # First use builds the BM25 corpus from every chunk: keep it off the loop
+            retrieved = await asyncio.to_thread(
+                fuse_keyword_hits, retrieved, query, pool, resume_ids
+            )
+        else:
+            retrieved = retrieved[:pool]
+
+        texts = dict(deps["load_texts"])
+        missing = [r["resume_id"] for r in retrieved if r["resume_id"] not in texts]
+        if missing:
+            texts.update(await asyncio.to_thread(_load_resume_texts, missing))
+
+        resumes_for_eval = [
+            {
+                "resume_id": r["resume_id"],
+                "filename": r["filename"],
+                "text": texts.get(r["resume_id"]) or r["text"],
+                "retrieval_score": r["score"],
+                "breakdown": r.get("breakdown", {}),
+            }
+            for r in retrieved
+        ]
+        if use_rerank:
+            # The cross-encoder sees ~512 tokens: score the JD-closest chunks,
+            # not the start (header/contact block) of each full resume
+            passages = await asyncio.to_thread(
+                best_chunks, run.jd_text, [r["resume_id"] for r in resumes_for_eval], RERANK_CHUNKS
+            )
+            for r in resumes_for_eval:
+                r["passages"] = passages.get(r["resume_id"], [])
+            query = build_query(run.jd_text, jd_analysis)
+            resumes_for_eval = await asyncio.to_thread(rerank, query, resumes_for_eval, top_n)
+            logger.info(f"[{run.run_id}] Rerank kept {len(resumes_for_eval)} of {len(retrieved)}")
 
+        run.resume_ids = [r["resume_id"] for r in resumes_for_eval]
+        duplicates = await asyncio.to_thread(documents.duplicates_of, run.resume_ids)
+        run.candidates = [
+            _candidate_score(r, duplicates.get(r["resume_id"], [])) for r in resumes_for_eval
+        ]
+        return resumes_for_eval
+
+    # ── Fit each resume into the evaluator's token budget ─────────────────
+    async def compress(deps: dict) -> list[dict]:
+        return await asyncio.to_thread(
+            compress_resumes, deps["rank"], deps["research"], EVAL_RESUME_TOKEN_BUDGET
+        )
+
+    # ── Evaluator ─────────────────────────────────────────────────────────
+    async def evaluate(deps: dict) -> list[CandidateEvaluation]:
+        _set_status(run, PipelineStatus.EVALUATING)
+        # Shards merge into run.evaluations as each one finishes; candidates
+        # that keep failing are recorded instead of failing the run
+        run.evaluations = []
+        run.failed_candidates = []
+        evaluations = await run_evaluator(
+            deps["research"],
+            deps["compress"],
+            shard_size=shard_size,
+            on_shard=lambda evals: _add_evaluations(run, evals),
+            on_failure=lambda failed: _add_failures(run, failed),
+            use_cache=run.use_llm_cache,
+            usage=run.llm_calls,
+        )
+        logger.info(
+            f"[{run.run_id}] Evaluator complete – {len(evaluations)} candidates scored, "
+            f"{len(run.failed_candidates)} failed"
+        )
+        return evaluations
 
-async def _run_pipeline(run: PipelineRun, top_n: int):
     try:
-        # ── Step 1: Researcher ────────────────────────────────────────────
-        run.status = PipelineStatus.RESEARCHING
-        jd_analysis = await run_researcher(run.jd_text)
-        run.jd_analysis = jd_analysis
-        logger.info(f"[{run.run_id}] Researcher complete")
+        _set_status(run, PipelineStatus.RESEARCHING)
+        await run_dag(
+            {
+                "research": ((), research),
+                "retrieve": ((), retrieve),
+                "load_texts": (("retrieve",), load_texts),
+                "rank": (("research", "retrieve", "load_texts"), rank),
+                "compress": (("research", "rank"), compress),
+                "evaluate": (("research", "compress"), evaluate),
+            },
+            timings=run.stage_timings,
+        )
 
-        # ── Step 2: Vector search ─────────────────────────────────────────
-        retrieved = query_resumes(run.jd_text, top_n=top_n)
-        if not retrieved:
-            run.status = PipelineStatus.FAILED
-            run.error = "No resumes found in the vector store."
-            return
+        # ── Pause for human approval ──────────────────────────────────────
+        _set_status(run, PipelineStatus.AWAITING_APPROVAL)
+        _start_predrafts(run)
+
+    except Exception as exc:
+        logger.exception(f"[{run.run_id}] Pipeline error")
+        _set_status(run, PipelineStatus.FAILED, str(exc))
 
-        # Reassemble full text for each resume
+
+def _canonical_resume_ids(resume_ids: list[str]) -> list[str]:
+    canonical = documents.canonical_ids(resume_ids)
+    return list(dict.fromkeys(canonical[rid] for rid in resume_ids))
+
+
+def _load_resume_texts(resume_ids: list[str]) -> dict[str, str]:
+    # Document store first; one bulk vector-store query for the rest
+    texts = documents.get_texts(resume_ids)
+    missing = [rid for rid in resume_ids if rid not in texts]
+    if missing:
+        texts.update(get_full_resume_texts(missing))
+    return texts
+
+
+@app.post("/api/pipeline/{run_id}/resumes", response_model=PipelineRunResponse)
+async def extend_pipeline(run_id: str, req: AddResumesRequest):
+    """Evaluate extra resumes against a finished run's stored JD analysis."""
+    run = pipeline_runs.get(run_id)
+    if not run:
+        raise HTTPException(404, "Pipeline run not found")
+    if run.jd_analysis is None or run.status not in (
+        PipelineStatus.AWAITING_APPROVAL,
+        PipelineStatus.COMPLETED,
+    ):
+        raise HTTPException(400, f"Cannot add resumes in status {run.status}")
+
+    # Already-scored candidates are never re-evaluated
+    scored = {e.resume_id for e in run.evaluations}
+    unknown = [
+        rid
+        for rid in dict.fromkeys(req.resume_ids)
+        if (doc := documents.get(rid, include_text=False)) is None or doc.doc_type != "resume"
+    ]
+    if unknown:
+        raise HTTPException(404, f"Resumes not found: {', '.join(unknown)}")
+    new_ids = [rid for rid in _canonical_resume_ids(req.resume_ids) if rid not in scored]
+    if not new_ids:
+        return _to_response(run)
+
+    # Flip status before returning so a second request can't start a parallel pass
+    _set_status(run, PipelineStatus.EVALUATING)
+    asyncio.create_task(_evaluate_added_resumes(run, new_ids, req.shard_size))
+    return _to_response(run)
+
+
+async def _evaluate_added_resumes(
+    run: PipelineRun, resume_ids: list[str], shard_size: Optional[int] = None
+):
+    try:
+        # Score the new resumes against the JD (restricted search), then reuse
+        # the stored JD analysis – the Researcher is not re-run
+        retrieved = await asyncio.to_thread(
+            dense_search, run.jd_text, len(resume_ids), resume_ids
+        )
+        hits = {r["resume_id"]: r for r in retrieved}
+        texts = await asyncio.to_thread(_load_resume_texts, resume_ids)
         resumes_for_eval: list[dict] = []
-        for r in retrieved:
-            full_text = get_full_resume_text(r["resume_id"])
+        for rid in resume_ids:
+            hit = hits.get(rid, {})
+            doc = documents.get(rid, include_text=False)
             resumes_for_eval.append(
                 {
-                    "resume_id": r["resume_id"],
-                    "filename": r["filename"],
-                    "text": full_text or r["text"],
+                    "resume_id": rid,
+                    "filename": doc.filename if doc else hit.get("filename", "unknown"),
+                    "text": texts.get(rid) or hit.get("text", ""),
+                    "retrieval_score": hit.get("score", 0.0),
+                    "breakdown": hit.get("breakdown", {}),
                 }
             )
-        run.resume_ids = [r["resume_id"] for r in resumes_for_eval]
-
-        # ── Step 3: Evaluator ─────────────────────────────────────────────
-        run.status = PipelineStatus.EVALUATING
-        evaluations = await run_evaluator(jd_analysis, resumes_for_eval)
-        run.evaluations = evaluations
-        logger.info(f"[{run.run_id}] Evaluator complete – {len(evaluations)} candidates scored")
 
-        # ── Pause for human approval ──────────────────────────────────────
-        run.status = PipelineStatus.AWAITING_APPROVAL
+        new = set(resume_ids)
+        duplicates = await asyncio.to_thread(documents.duplicates_of, resume_ids)
+        run.resume_ids = [rid for rid in run.resume_ids if rid not in new] + resume_ids
+        run.candidates = [c for c in run.candidates if c.resume_id not in new] + [
+            _candidate_score(r, duplicates.get(r["resume_id"], [])) for r in resumes_for_eval
+        ]
+        run.failed_candidates = [f for f in run.failed_candidates if f.resume_id not in new]
+        pipeline_runs.save(run)
+
+        resumes_for_eval = await asyncio.to_thread(
+            compress_resumes, resumes_for_eval, run.jd_analysis, EVAL_RESUME_TOKEN_BUDGET
+        )
+        evaluations = await run_evaluator(
+            run.jd_analysis,
+            resumes_for_eval,
+            shard_size=shard_size,
+            on_shard=lambda evals: _add_evaluations(run, evals),
+            on_failure=lambda failed: _add_failures(run, failed),
+            use_cache=run.use_llm_cache,
+            usage=run.llm_calls,
+        )
+        # Merge the newcomers into the ranked list
+        run.evaluations.sort(key=lambda e: e.match_percentage, reverse=True)
+        _set_status(run, PipelineStatus.AWAITING_APPROVAL)
+        _start_predrafts(run)
+        logger.info(f"[{run.run_id}] Added {len(evaluations)} of {len(resume_ids)} resumes")
 
     except Exception as exc:
-        logger.exception(f"[{run.run_id}] Pipeline error")
-        run.status = PipelineStatus.FAILED
-        run.error = str(exc)
+        # Earlier evaluations stay valid; only this increment is lost
+        logger.exception(f"[{run.run_id}] Incremental evaluation error")
+        _set_status(run, PipelineStatus.AWAITING_APPROVAL, str(exc))
+
+
+@app.post("/api/match/jds", response_model=list[JDMatchResult])
+async def match_jds(req: MatchJDsRequest):
+    """Rank the resume pool against many JDs in one batched similarity pass."""
+    jds: list[DocumentMeta] = []
+    for jd_id in dict.fromkeys(req.jd_ids):
+        jd = documents.get(jd_id)
+        if not jd or jd.doc_type != "jd":
+            raise HTTPException(404, f"JD not found: {jd_id}")
+        jds.append(jd)
+
+    resume_ids = _canonical_resume_ids(req.resume_ids) if req.resume_ids else None
+    resume_count = len(resume_ids) if resume_ids else documents.count("resume", canonical_only=True)
+    if resume_count == 0:
+        raise HTTPException(400, "No resumes uploaded yet")
+    top_n = min(req.top_n, resume_count)
+
+    # Rank deep enough to seed each fanned-out pipeline's retrieval stage too
+    depth = top_n
+    if req.start_pipelines:
+        use_rerank = RERANK_ENABLED if req.rerank is None else req.rerank
+        depth = max(depth, _retrieval_depth(top_n, use_rerank)[1])
+    ranked = await asyncio.to_thread(match_many, [jd.text for jd in jds], depth, resume_ids)
+
+    results: list[JDMatchResult] = []
+    for jd, hits in zip(jds, ranked):
+        shown = hits[:top_n]
+        duplicates = await asyncio.to_thread(documents.duplicates_of, [h["resume_id"] for h in shown])
+        run_id = None
+        if req.start_pipelines and hits:
+            run_id = _launch_pipeline(jd, req, top_n, resume_ids, retrieved=hits).run_id
+        results.append(
+            JDMatchResult(
+                jd_id=jd.id,
+                filename=jd.filename,
+                candidates=[
+                    _candidate_score(
+                        {**h, "retrieval_score": h["score"]}, duplicates.get(h["resume_id"], [])
+                    )
+                    for h in shown
+                ],
+                run_id=run_id,
+            )
+        )
+    return results
+
+
+@app.get("/api/pipeline", response_model=list[PipelineRunResponse])
+async def list_pipelines(workspace_id: str = DEFAULT_WORKSPACE, jd_id: Optional[str] = None):
+    """A workspace's runs (optionally only those for one JD), oldest first."""
+    runs = (pipeline_runs.get(rid) for rid in pipeline_runs.list_ids(workspace_id, jd_id))
+    return [_to_response(run) for run in runs if run is not None]
 
 
 @app.get("/api/pipeline/{run_id}", response_model=PipelineRunResponse)
@@ -159,6 +520,35 @@ async def get_pipeline(run_id: str):
     return _to_response(run)
 
 
+@app.get("/api/pipeline/{run_id}/events")
+async def stream_pipeline(run_id: str):
+    """Server-Sent Events: a snapshot, then status / per-candidate updates."""
+    run = pipeline_runs.get(run_id)
+    if not run:
+        raise HTTPException(404, "Pipeline run not found")
+
+    async def _event_stream():
+        with events.subscribe(run_id) as queue:
+            yield events.format_sse("snapshot", _to_response(run).model_dump(mode="json"))
+            if run.status not in ACTIVE_STATUSES:
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield events.format_sse(event, data)
+                if event == "status" and PipelineStatus(data["status"]) not in ACTIVE_STATUSES:
+                    return
+
+    return StreamingResponse(
+        _event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/pipeline/{run_id}/approve", response_model=PipelineRunResponse)
 async def approve_shortlist(run_id: str, req: ApproveShortlistRequest):
     run = pipeline_runs.get(run_id)
@@ -168,44 +558,163 @@ async def approve_shortlist(run_id: str, req: ApproveShortlistRequest):
         raise HTTPException(400, f"Cannot approve in status {run.status}")
 
     run.approved_resume_ids = req.approved_resume_ids
+    approved = set(req.approved_resume_ids)
+
+    # Reuse finished drafts (and emails from an earlier approval) for approved ids
+    ready = {e.resume_id: e for e in run.drafts + run.emails if e.resume_id in approved}
+    # Drafts for candidates that weren't approved are abandoned; in-flight
+    # drafts for approved ones are kept and bumped to interactive priority
+    drafting: dict[str, asyncio.Task] = {}
+    for resume_id, task in _draft_tasks.pop(run.run_id, {}).items():
+        if resume_id in approved and resume_id not in ready:
+            drafting[resume_id] = task
+            get_scheduler().promote(_draft_job(run.run_id, resume_id), Priority.INTERACTIVE)
+        else:
+            task.cancel()
+    run.drafts = []
+    run.emails = []
+    _add_emails(run, list(ready.values()))
+
+    pending = [
+        e for e in run.evaluations
+        if e.resume_id in approved and e.resume_id not in ready and e.resume_id not in drafting
+    ]
+    if not pending and not drafting:
+        _set_status(run, PipelineStatus.COMPLETED)
+        return _to_response(run)
     # Launch email-writing in background
-    asyncio.create_task(_write_emails(run))
+    _set_status(run, PipelineStatus.WRITING_EMAILS)
+    asyncio.create_task(_write_emails(run, pending, drafting))
     return _to_response(run)
 
 
-async def _write_emails(run: PipelineRun):
+async def _write_emails(
+    run: PipelineRun,
+    evaluations: list[CandidateEvaluation],
+    drafting: Optional[dict[str, asyncio.Task]] = None,
+):
     try:
-        run.status = PipelineStatus.WRITING_EMAILS
-
-        approved_evals = [
-            e for e in run.evaluations if e.resume_id in run.approved_resume_ids
-        ]
-        if not approved_evals:
-            run.status = PipelineStatus.COMPLETED
+        # Per-candidate writer calls; each email lands in run.emails when ready
+        failed: list[str] = []
+        errors: list[str] = []
+
+        def _on_failure(resume_id: str, error: str) -> None:
+            logger.warning(f"[{run.run_id}] Email failed for {resume_id}: {error}")
+            failed.append(resume_id)
+            errors.append(error)
+
+        async def _write(evals: list[CandidateEvaluation]) -> None:
+            if not evals:
+                return
+            try:
+                resumes_for_writer = await asyncio.to_thread(_resumes_for_writer, run, evals)
+                await run_writer(
+                    run.jd_analysis,
+                    evals,
+                    resumes_for_writer,
+                    on_email=lambda email: _add_emails(run, [email]),
+                    on_failure=_on_failure,
+                    use_cache=run.use_llm_cache,
+                    usage=run.llm_calls,
+                )
+            except Exception as exc:
+                # run_writer raises once its whole subset failed; success or
+                # failure is judged over the full approval set below
+                for ev in evals:
+                    if ev.resume_id not in failed:
+                        _on_failure(ev.resume_id, f"{type(exc).__name__}: {exc}")
+
+        async def _draft_result(resume_id: str, task: asyncio.Task) -> tuple[str, list[OutreachEmail]]:
+            return resume_id, await task
+
+        async def _adopt_drafts() -> None:
+            # Take approved candidates' speculative drafts as each one finishes;
+            # only the ones whose draft failed are written again
+            redo: set[str] = set()
+            pending = [_draft_result(rid, task) for rid, task in (drafting or {}).items()]
+            for next_draft in asyncio.as_completed(pending):
+                resume_id, emails = await next_draft
+                if emails:
+                    _add_emails(run, emails)
+                else:
+                    redo.add(resume_id)
+            await _write([e for e in run.evaluations if e.resume_id in redo])
+
+        await asyncio.gather(_write(evaluations), _adopt_drafts())
+        if failed and not run.emails:
+            _set_status(run, PipelineStatus.FAILED, f"All {len(failed)} emails failed: {errors[0]}")
             return
+        error = f"Email drafting failed for: {', '.join(failed)}" if failed else None
+        _set_status(run, PipelineStatus.COMPLETED, error)
+        logger.info(f"[{run.run_id}] Writer complete – {len(run.emails)} emails drafted")
 
-        # Gather resume texts for the writer
-        resumes_for_writer: list[dict] = []
-        for ev in approved_evals:
-            text = get_full_resume_text(ev.resume_id)
-            doc = documents.get(ev.resume_id)
-            resumes_for_writer.append(
-                {
-                    "resume_id": ev.resume_id,
-                    "filename": doc.filename if doc else "unknown",
-                    "text": text,
-                }
-            )
+    except Exception as exc:
+        logger.exception(f"[{run.run_id}] Writer error")
+        _set_status(run, PipelineStatus.FAILED, str(exc))
+
+
+def _resumes_for_writer(run: PipelineRun, evaluations: list[CandidateEvaluation]) -> list[dict]:
+    # Gather resume texts for the writer (one bulk lookup), fit to its budget
+    texts = _load_resume_texts([ev.resume_id for ev in evaluations])
+    resumes: list[dict] = []
+    for ev in evaluations:
+        doc = documents.get(ev.resume_id, include_text=False)
+        resumes.append(
+            {
+                "resume_id": ev.resume_id,
+                "filename": doc.filename if doc else "unknown",
+                "text": texts.get(ev.resume_id, ""),
+            }
+        )
+    return compress_resumes(resumes, run.jd_analysis, WRITER_RESUME_TOKEN_BUDGET)
+
+
+def _start_predrafts(run: PipelineRun) -> None:
+    """Opt-in: draft shortlisted candidates' emails before anyone approves."""
+    if not run.speculative_drafts:
+        return
+    tasks = _draft_tasks.setdefault(run.run_id, {})
+    drafted = {d.resume_id for d in run.drafts + run.emails}
+    for ev in run.evaluations:
+        if ev.shortlisted and ev.resume_id not in drafted and ev.resume_id not in tasks:
+            tasks[ev.resume_id] = asyncio.create_task(_predraft_email(run, ev))
 
-        emails = await run_writer(run.jd_analysis, approved_evals, resumes_for_writer)
-        run.emails = emails
-        run.status = PipelineStatus.COMPLETED
-        logger.info(f"[{run.run_id}] Writer complete – {len(emails)} emails drafted")
 
+def _cancel_drafts(run_id: str) -> None:
+    for task in _draft_tasks.pop(run_id, {}).values():
+        task.cancel()
+
+
+def _draft_job(run_id: str, resume_id: str) -> tuple[str, str, str]:
+    return ("draft", run_id, resume_id)
+
+
+async def _predraft_email(run: PipelineRun, evaluation: CandidateEvaluation) -> list[OutreachEmail]:
+    """Draft one email at background priority; returns [] if drafting failed."""
+    try:
+        with get_scheduler().job(_draft_job(run.run_id, evaluation.resume_id)):
+            resumes = await asyncio.to_thread(_resumes_for_writer, run, [evaluation])
+            emails = await run_writer(
+                run.jd_analysis,
+                [evaluation],
+                resumes,
+                use_cache=run.use_llm_cache,
+                usage=run.llm_calls,
+                priority=Priority.BACKGROUND,
+            )
+    except asyncio.CancelledError:
+        raise
     except Exception as exc:
-        logger.exception(f"[{run.run_id}] Writer error")
-        run.status = PipelineStatus.FAILED
-        run.error = str(exc)
+        # Not fatal: the candidate is simply drafted on approval instead
+        logger.warning(f"[{run.run_id}] Speculative draft failed for {evaluation.resume_id}: {exc}")
+        return []
+    finally:
+        # Approval takes over the run's draft tasks, handing approved ones to _write_emails
+        speculative = _draft_tasks.get(run.run_id, {}).pop(evaluation.resume_id, None) is not None
+    if speculative:
+        run.drafts.extend(emails)
+        pipeline_runs.save(run)
+    return emails
 
 
 @app.put("/api/pipeline/{run_id}/emails/{resume_id}", response_model=PipelineRunResponse)
@@ -218,6 +727,7 @@ async def edit_email(run_id: str, resume_id: str, req: EditEmailRequest):
         if email.resume_id == resume_id:
             email.subject = req.subject
             email.body = req.body
+            pipeline_runs.save(run)
             return _to_response(run)
 
     raise HTTPException(404, "Email not found for given resume_id")
@@ -225,24 +735,92 @@ async def edit_email(run_id: str, resume_id: str, req: EditEmailRequest):
 
 # Helpers
 
+def _candidate_score(resume: dict, duplicate_ids: Optional[list[str]] = None) -> CandidateScore:
+    return CandidateScore(
+        resume_id=resume["resume_id"],
+        filename=resume["filename"],
+        retrieval_score=resume["retrieval_score"],
+        rerank_score=resume.get("rerank_score"),
+        breakdown=resume["breakdown"],
+        duplicate_ids=duplicate_ids or [],
+    )
+
+
+def _set_status(run: PipelineRun, status: PipelineStatus, error: Optional[str] = None) -> None:
+    run.status = status
+    if error is not None:
+        run.error = error
+    pipeline_runs.save(run)
+    events.publish(run.run_id, "status", {"status": status.value, "error": run.error})
+
+
+def _set_jd_analysis(run: PipelineRun, jd_analysis: JDAnalysis) -> None:
+    run.jd_analysis = jd_analysis
+    pipeline_runs.save(run)
+    events.publish(run.run_id, "jd_analysis", jd_analysis.model_dump(mode="json"))
+
+
+def _add_evaluations(run: PipelineRun, evaluations: list[CandidateEvaluation]) -> None:
+    run.evaluations.extend(evaluations)
+    pipeline_runs.save(run)
+    for ev in evaluations:
+        events.publish(run.run_id, "evaluation", ev.model_dump(mode="json"))
+
+
+def _add_failures(run: PipelineRun, failures: list[CandidateFailure]) -> None:
+    run.failed_candidates.extend(failures)
+    pipeline_runs.save(run)
+    for failure in failures:
+        logger.warning(f"[{run.run_id}] Evaluation failed for {failure.resume_id}: {failure.error}")
+        events.publish(run.run_id, "candidate_failed", failure.model_dump(mode="json"))
+
+
+def _add_emails(run: PipelineRun, emails: list[OutreachEmail]) -> None:
+    run.emails.extend(emails)
+    pipeline_runs.save(run)
+    for email in emails:
+        events.publish(run.run_id, "email", email.model_dump(mode="json"))
+
+
 def _to_response(run: PipelineRun) -> PipelineRunResponse:
     return PipelineRunResponse(
         run_id=run.run_id,
         status=run.status,
         jd_analysis=run.jd_analysis,
+        candidates=run.candidates,
         evaluations=run.evaluations,
+        failed_candidates=run.failed_candidates,
         emails=run.emails,
+        stage_timings=run.stage_timings,
+        llm_calls=run.llm_calls,
         error=run.error,
     )
 
 
+# Metrics
+
+@app.get("/api/metrics")
+async def metrics():
+    return {"llm_cache": llm_cache.stats(), "llm_scheduler": get_scheduler().stats()}
+
+
 # Session reset (explicit)
 
 @app.post("/api/session/reset")
-async def reset_session():
-    """Manually purge all in-memory state and ChromaDB embeddings."""
+async def reset_session(workspace_id: Optional[str] = None):
+    """Purge one workspace's JDs and runs, or (no workspace) everything incl. the resume pool."""
+    if workspace_id is not None:
+        for run_id in pipeline_runs.list_ids(workspace_id=workspace_id):
+            _cancel_drafts(run_id)
+        documents.delete_workspace(workspace_id)
+        pipeline_runs.delete_workspace(workspace_id)
+        return {"status": "ok"}
+
+    for run_id in list(_draft_tasks):
+        _cancel_drafts(run_id)
     documents.clear()
     pipeline_runs.clear()
+    get_dedup_index().clear()
     reset_collection()
     return {"status": "ok"}
 
@@ -19,15 +19,35 @@ class PipelineStatus(str, Enum):
     FAILED = "failed"
 
 
+# Statuses during which a background task is still producing results
+ACTIVE_STATUSES = frozenset(
+    {
+        PipelineStatus.PENDING,
+        PipelineStatus.RESEARCHING,
+        PipelineStatus.EVALUATING,
+        PipelineStatus.WRITING_EMAILS,
+    }
+)
+
+
 # Ingestion
 class DocumentMeta(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     filename: str
     doc_type: str  # "jd" | "resume"
+    workspace_id: Optional[str] = None  # set for JDs; resumes are a shared pool
     text: str
+    sha256: str = ""  # content hash of the raw upload
+    duplicate_of: Optional[str] = None  # canonical resume id for near-duplicates
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class ResumeUploadResult(BaseModel):
+    filename: str
+    document: Optional[DocumentMeta] = None
+    error: Optional[str] = None
+
+
 # Researcher output
 class JDAnalysis(BaseModel):
     role_title: str = ""
@@ -58,6 +78,33 @@ class CandidateEvaluation(BaseModel):
     shortlisted: bool = False
 
 
+# A candidate the evaluator still couldn't score after its retries
+class CandidateFailure(BaseModel):
+    resume_id: str
+    filename: str = ""
+    error: str = ""
+    attempts: int = 1
+
+
+# Retrieval / rerank scores for a candidate that reached the evaluator
+class CandidateScore(BaseModel):
+    resume_id: str
+    filename: str = ""
+    retrieval_score: float = 0.0
+    rerank_score: Optional[float] = None
+    breakdown: dict = {}
+    duplicate_ids: list[str] = []  # near-duplicate uploads collapsed into this one
+
+
+# Per LLM call accounting (token counts are None when served from cache)
+class LLMCallStats(BaseModel):
+    agent: str
+    estimated_prompt_tokens: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached: bool = False
+
+
 # Writer output
 class OutreachEmail(BaseModel):
     resume_id: str
@@ -70,13 +117,21 @@ class OutreachEmail(BaseModel):
 class PipelineRun(BaseModel):
     run_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     status: PipelineStatus = PipelineStatus.PENDING
+    workspace_id: str = ""
     jd_id: str = ""
     jd_text: str = ""
     jd_analysis: Optional[JDAnalysis] = None
     resume_ids: list[str] = []
+    candidates: list[CandidateScore] = []
     evaluations: list[CandidateEvaluation] = []
+    failed_candidates: list[CandidateFailure] = []
     approved_resume_ids: list[str] = []
     emails: list[OutreachEmail] = []
+    drafts: list[OutreachEmail] = []  # speculative emails for shortlisted candidates
+    stage_timings: dict[str, float] = {}  # stage name → seconds
+    llm_calls: list[LLMCallStats] = []
+    use_llm_cache: bool = True
+    speculative_drafts: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
     error: Optional[str] = None
 
@@ -85,6 +140,34 @@ class PipelineRun(BaseModel):
 class StartPipelineRequest(BaseModel):
     jd_id: str
     top_n: int = 5
+    resume_ids: Optional[list[str]] = None  # restrict search to these resumes
+    rerank: Optional[bool] = None  # override RERANK_ENABLED for this run
+    bypass_cache: bool = False  # force fresh LLM calls (results still cached)
+    speculative_drafts: Optional[bool] = None  # override SPECULATIVE_DRAFTS for this run
+    shard_size: Optional[int] = Field(default=None, ge=1)  # resumes per evaluator call
+
+
+class MatchJDsRequest(BaseModel):
+    jd_ids: list[str] = Field(min_length=1)
+    top_n: int = 5
+    resume_ids: Optional[list[str]] = None  # restrict matching to these resumes
+    start_pipelines: bool = False  # also launch a pipeline run per JD
+    rerank: Optional[bool] = None  # run options, as for StartPipelineRequest
+    bypass_cache: bool = False
+    shard_size: Optional[int] = Field(default=None, ge=1)
+    speculative_drafts: Optional[bool] = None
+
+
+class JDMatchResult(BaseModel):
+    jd_id: str
+    filename: str
+    candidates: list[CandidateScore] = []
+    run_id: Optional[str] = None  # set when start_pipelines is true
+
+
+class AddResumesRequest(BaseModel):
+    resume_ids: list[str] = Field(min_length=1)
+    shard_size: Optional[int] = Field(default=None, ge=1)  # resumes per evaluator call
 
 
 class ApproveShortlistRequest(BaseModel):
@@ -100,6 +183,10 @@ class PipelineRunResponse(BaseModel):
     run_id: str
     status: PipelineStatus
     jd_analysis: Optional[JDAnalysis] = None
+    candidates: list[CandidateScore] = []
     evaluations: list[CandidateEvaluation] = []
+    failed_candidates: list[CandidateFailure] = []
     emails: list[OutreachEmail] = []
+    stage_timings: dict[str, float] = {}
+    llm_calls: list[LLMCallStats] = []
     error: Optional[str] = None
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from app.config import RERANK_BATCH_SIZE, RERANK_MODEL
+from app.models import JDAnalysis
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+# Singleton CPU cross-encoder (loaded on first use)
+_model: CrossEncoder | None = None
+
+
+def _get_model() -> CrossEncoder:
+    global _model
+    if _model is None:
+        # Imported here so torch is only loaded when reranking is actually used
+        from sentence_transformers import CrossEncoder
+
+        _model = CrossEncoder(RERANK_MODEL, device="cpu")
+    return _model
+
+
+def build_query(jd_text: str, jd_analysis: JDAnalysis | None = None) -> str:
+    # The model only sees ~512 tokens, so prefer the compact structured JD
+    if jd_analysis is None:
+        return jd_text
+    parts = [jd_analysis.role_title, jd_analysis.summary, *jd_analysis.technical_requirements]
+    return "\n".join(p for p in parts if p) or jd_text
+
+
+def rerank(
+    query: str,
+    candidates: list[dict],
+    top_n: int,
+    batch_size: int = RERANK_BATCH_SIZE,
+) -> list[dict]:
+    """Score each candidate's passages against the query and keep the best
+    top_n (blocking). A candidate scores its best passage; ``passages``
+    defaults to ``[text]``."""
+    if not candidates:
+        return []
+    pairs: list[tuple[str, str]] = []
+    owners: list[int] = []
+    for i, candidate in enumerate(candidates):
+        for passage in candidate.get("passages") or [candidate["text"]]:
+            pairs.append((query, passage))
+            owners.append(i)
+    scores = _get_model().predict(pairs, batch_size=batch_size, show_progress_bar=False)
+    best = [float("-inf")] * len(candidates)
+    for i, score in zip(owners, scores):
+        best[i] = max(best[i], float(score))
+    for candidate, score in zip(candidates, best):
+        candidate["rerank_score"] = score
+    ranked = sorted(candidates, key=lambda c: c["rerank_score"], reverse=True)
+    return ranked[:top_n]
@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+from app.models import (
+    ACTIVE_STATUSES,
+    CandidateFailure,
+    DocumentMeta,
+    PipelineRun,
+    PipelineStatus,
+)
+
+
+# Everything but the full text (listings and metadata lookups)
+_META_COLUMNS = "id, filename, doc_type, workspace_id, sha256, duplicate_of, uploaded_at"
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class DocumentStore:
+    """SQLite-backed documents with an LRU of recently used full texts."""
+
+    def __init__(self, path: Path, cache_size: int = 256):
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._cache: OrderedDict[str, DocumentMeta] = OrderedDict()
+        self._cache_size = cache_size
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                doc_type TEXT NOT NULL,
+                workspace_id TEXT,
+                sha256 TEXT NOT NULL DEFAULT '',
+                duplicate_of TEXT,
+                uploaded_at TEXT NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_type ON documents(doc_type);
+            CREATE INDEX IF NOT EXISTS idx_documents_workspace ON documents(workspace_id);
+            CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents(sha256);
+            """
+        )
+        # Databases created before near-duplicate linking lack the column
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if "duplicate_of" not in columns:
+            self._conn.execute("ALTER TABLE documents ADD COLUMN duplicate_of TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_duplicate ON documents(duplicate_of)"
+        )
+        self._conn.commit()
+
+    def _remember(self, meta: DocumentMeta) -> None:
+        self._cache[meta.id] = meta
+        self._cache.move_to_end(meta.id)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def put(self, meta: DocumentMeta) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(id, filename, doc_type, workspace_id, sha256, duplicate_of, uploaded_at, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    meta.id,
+                    meta.filename,
+                    meta.doc_type,
+                    meta.workspace_id,
+                    meta.sha256,
+                    meta.duplicate_of,
+                    meta.uploaded_at.isoformat(),
+                    meta.text,
+                ),
+            )
+            self._conn.commit()
+            self._remember(meta)
+
+    def put_many(self, metas: Iterable[DocumentMeta]) -> None:
+        for meta in metas:
+            self.put(meta)
+
+    def get(self, doc_id: str, include_text: bool = True) -> Optional[DocumentMeta]:
+        with self._lock:
+            if doc_id in self._cache:
+                self._cache.move_to_end(doc_id)
+                return self._cache[doc_id]
+            columns = "*" if include_text else _META_COLUMNS
+            row = self._conn.execute(
+                f"SELECT {columns} FROM documents WHERE id = ?", (doc_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            meta = DocumentMeta(**{"text": "", **dict(row)})
+            if include_text:
+                self._remember(meta)
+            return meta
+
+    def get_texts(self, doc_ids: list[str]) -> dict[str, str]:
+        with self._lock:
+            texts = {i: self._cache[i].text for i in doc_ids if i in self._cache}
+            missing = [i for i in dict.fromkeys(doc_ids) if i not in texts]
+            for start in range(0, len(missing), 500):
+                part = missing[start : start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT id, text FROM documents WHERE id IN ({marks})", part
+                ).fetchall()
+                texts.update((row["id"], row["text"]) for row in rows)
+            return texts
+
+    def list(
+        self,
+        doc_type: Optional[str] = None,
+        workspace_id: Optional[str] = None,
+        include_text: bool = False,
+    ) -> list[DocumentMeta]:
+        # Text is only loaded on request; listings stay cheap for large pools
+        columns = "*" if include_text else _META_COLUMNS
+        clauses, params = [], []
+        if doc_type is not None:
+            clauses.append("doc_type = ?")
+            params.append(doc_type)
+        if workspace_id is not None:
+            clauses.append("workspace_id = ?")
+            params.append(workspace_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM documents {where} ORDER BY uploaded_at", params
+            ).fetchall()
+        return [DocumentMeta(**{"text": "", **dict(row)}) for row in rows]
+
+    def count(self, doc_type: Optional[str] = None, canonical_only: bool = False) -> int:
+        clauses, params = [], []
+        if doc_type is not None:
+            clauses.append("doc_type = ?")
+            params.append(doc_type)
+        if canonical_only:
+            clauses.append("duplicate_of IS NULL")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM documents {where}", params).fetchone()[0]
+
+    def canonical_ids(self, doc_ids: list[str]) -> dict[str, str]:
+        """Map each id to the resume it duplicates (itself when canonical)."""
+        canonical = {i: i for i in doc_ids}
+        unique = list(dict.fromkeys(doc_ids))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start : start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT id, duplicate_of FROM documents "
+                    f"WHERE id IN ({marks}) AND duplicate_of IS NOT NULL",
+                    part,
+                ).fetchall()
+                canonical.update((row["id"], row["duplicate_of"]) for row in rows)
+        return canonical
+
+    def duplicates_of(self, doc_ids: list[str]) -> dict[str, list[str]]:
+        """Near-duplicate ids linked to each of the given canonical ids."""
+        linked: dict[str, list[str]] = {}
+        unique = list(dict.fromkeys(doc_ids))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start : start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT id, duplicate_of FROM documents WHERE duplicate_of IN ({marks}) "
+                    f"ORDER BY uploaded_at",
+                    part,
+                ).fetchall()
+                for row in rows:
+                    linked.setdefault(row["duplicate_of"], []).append(row["id"])
+        return linked
+
+    def delete_workspace(self, workspace_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE workspace_id = ?", (workspace_id,))
+            self._conn.commit()
+            for doc_id in [d.id for d in self._cache.values() if d.workspace_id == workspace_id]:
+                self._cache.pop(doc_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.commit()
+            self._cache.clear()
+
+
+class RunStore:
+    """SQLite-backed pipeline runs.
+
+    Runs in an active status are pinned in memory (background tasks mutate
+    them in place); every other run is served from a TTL/LRU cache and
+    reloaded from SQLite on demand.
+    """
+
+    def __init__(self, path: Path, cache_size: int = 100, ttl_seconds: float = 3600):
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._active: dict[str, PipelineRun] = {}
+        # Runs deleted while a background task still held them; later saves
+        # from that task must not resurrect the row
+        self._deleted: set[str] = set()
+        self._cache: OrderedDict[str, tuple[float, PipelineRun]] = OrderedDict()
+        self._cache_size = cache_size
+        self._ttl = ttl_seconds
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                workspace_id TEXT NOT NULL,
+                jd_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_jd ON runs(jd_id);
+            CREATE INDEX IF NOT EXISTS idx_runs_workspace ON runs(workspace_id);
+            CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status);
+            """
+        )
+        self._conn.commit()
+        self._recover_interrupted()
+
+    def _recover_interrupted(self) -> None:
+        # Runs that were mid-flight when the process died have no task left
+        marks = ",".join("?" * len(ACTIVE_STATUSES))
+        rows = self._conn.execute(
+            f"SELECT data FROM runs WHERE status IN ({marks})",
+            [s.value for s in ACTIVE_STATUSES],
+        ).fetchall()
+        for row in rows:
+            run = PipelineRun.model_validate_json(row["data"])
+            if run.jd_analysis is not None and run.evaluations:
+                # Evaluations already stored stay valid (e.g. an interrupted
+                # extension): only the in-flight work is lost
+                run.evaluations.sort(key=lambda e: e.match_percentage, reverse=True)
+                # Surface the candidates that never got scored so they can be
+                # re-added via /resumes instead of silently missing
+                done = {e.resume_id for e in run.evaluations}
+                done.update(f.resume_id for f in run.failed_candidates)
+                filenames = {c.resume_id: c.filename for c in run.candidates}
+                run.failed_candidates.extend(
+                    CandidateFailure(
+                        resume_id=rid,
+                        filename=filenames.get(rid, ""),
+                        error="Not evaluated: interrupted by a server restart",
+                        attempts=0,
+                    )
+                    for rid in dict.fromkeys(run.resume_ids)
+                    if rid not in done
+                )
+                run.status = PipelineStatus.AWAITING_APPROVAL
+                run.error = "Interrupted by a server restart; earlier evaluations were kept"
+            else:
+                run.status = PipelineStatus.FAILED
+                run.error = "Interrupted by a server restart"
+            self._write(run)
+        self._conn.commit()
+
+    def _write(self, run: PipelineRun) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO runs (run_id, workspace_id, jd_id, status, created_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                run.run_id,
+                run.workspace_id,
+                run.jd_id,
+                run.status.value,
+                run.created_at.isoformat(),
+                run.model_dump_json(),
+            ),
+        )
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._cache:
+            run_id, (touched, _) = next(iter(self._cache.items()))
+            if len(self._cache) <= self._cache_size and now - touched < self._ttl:
+                break
+            self._cache.pop(run_id)
+
+    def _place(self, run: PipelineRun) -> None:
+        if run.status in ACTIVE_STATUSES:
+            self._cache.pop(run.run_id, None)
+            self._active[run.run_id] = run
+        else:
+            self._active.pop(run.run_id, None)
+            self._cache[run.run_id] = (time.monotonic(), run)
+            self._cache.move_to_end(run.run_id)
+            self._evict()
+
+    def save(self, run: PipelineRun) -> None:
+        with self._lock:
+            if run.run_id in self._deleted:
+                return
+            self._write(run)
+            self._conn.commit()
+            self._place(run)
+
+    def get(self, run_id: str) -> Optional[PipelineRun]:
+        with self._lock:
+            if run_id in self._active:
+                return self._active[run_id]
+            if run_id in self._cache:
+                run = self._cache[run_id][1]
+            else:
+                row = self._conn.execute(
+                    "SELECT data FROM runs WHERE run_id = ?", (run_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                run = PipelineRun.model_validate_json(row["data"])
+            self._place(run)
+            return run
+
+    def list_ids(
+        self,
+        workspace_id: Optional[str] = None,
+        jd_id: Optional[str] = None,
+    ) -> list[str]:
+        clauses, params = [], []
+        if workspace_id is not None:
+            clauses.append("workspace_id = ?")
+            params.append(workspace_id)
+        if jd_id is not None:
+            clauses.append("jd_id = ?")
+            params.append(jd_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT run_id FROM runs {where} ORDER BY created_at", params
+            ).fetchall()
+        return [row["run_id"] for row in rows]
+
+    def delete_workspace(self, workspace_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM runs WHERE workspace_id = ?", (workspace_id,))
+            self._conn.commit()
+            self._deleted.update(
+                rid for rid, run in self._active.items() if run.workspace_id == workspace_id
+            )
+            self._active = {
+                rid: run for rid, run in self._active.items() if run.workspace_id != workspace_id
+            }
+            for run_id in [
+                rid for rid, (_, run) in self._cache.items() if run.workspace_id == workspace_id
+            ]:
+                self._cache.pop(run_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM runs")
+            self._conn.commit()
+            self._deleted.update(self._active)
+            self._active.clear()
+            self._cache.clear()
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Optional, Protocol
+
+import numpy as np
+
+from app.store import _connect
+
+
+class VectorBackend(Protocol):
+    """Chunk storage + nearest-neighbour search behind ``vector_store``.
+
+    Embeddings are computed by the caller (through the cached embedding
+    function), so backends only store and compare vectors. Distances are
+    cosine distances (``1 - similarity``), best match first.
+    """
+
+    def count(self) -> int: ...
+
+    def upsert(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict],
+        embeddings: np.ndarray,
+    ) -> None: ...
+
+    def query(
+        self,
+        embedding: np.ndarray,
+        n_results: int,
+        resume_ids: Optional[list[str]] = None,
+    ) -> list[tuple[dict, str, float]]: ...
+
+    def get(
+        self,
+        resume_ids: Optional[list[str]] = None,
+        include_embeddings: bool = False,
+    ) -> dict[str, Any]: ...
+
+    def delete(self, resume_id: str) -> None: ...
+
+    def reset(self) -> None: ...
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+# ── Chroma (persistent HNSW collection) ──────────────────────────────────────
+
+def _chroma_embedding_function(fn: Any) -> Any:
+    """Adapt a plain ``fn(texts) -> vectors`` to Chroma's EmbeddingFunction type."""
+    from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+    class _Adapter(EmbeddingFunction[Documents]):
+        def __call__(self, input: Documents) -> Embeddings:
+            return fn(input)
+
+    return _Adapter()
+
+
+class ChromaBackend:
+    def __init__(self, path: Path, embedding_function: Any = None):
+        import chromadb
+        from chromadb.config import Settings
+
+        self._client = chromadb.PersistentClient(
+            path=str(path),
+            settings=Settings(anonymized_telemetry=False),
+        )
+        self._embedding_function = (
+            _chroma_embedding_function(embedding_function) if embedding_function else None
+        )
+        self._collection = self._open()
+
+    def _open(self):
+        return self._client.get_or_create_collection(
+            name="resumes",
+            embedding_function=self._embedding_function,
+            metadata={"hnsw:space": "cosine"},
+        )
+
+    @staticmethod
+    def _where(resume_ids: Optional[list[str]]) -> Optional[dict]:
+        return {"resume_id": {"$in": list(dict.fromkeys(resume_ids))}} if resume_ids else None
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def upsert(self, ids, documents, metadatas, embeddings) -> None:
+        self._collection.upsert(
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+        )
+
+    def query(self, embedding, n_results, resume_ids=None):
+        results = self._collection.query(
+            query_embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
+            n_results=n_results,
+            where=self._where(resume_ids),
+            include=["documents", "metadatas", "distances"],
+        )
+        return list(zip(results["metadatas"][0], results["documents"][0], results["distances"][0]))
+
+    def get(self, resume_ids=None, include_embeddings=False):
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        results = self._collection.get(where=self._where(resume_ids), include=include)
+        out = {
+            "ids": results["ids"],
+            "documents": results["documents"],
+            "metadatas": results["metadatas"],
+        }
+        if include_embeddings:
+            embeddings = results["embeddings"]
+            out["embeddings"] = (
+                np.asarray(embeddings, dtype=np.float32)
+                if embeddings is not None and len(embeddings)
+                else np.zeros((0, 0), dtype=np.float32)
+            )
+        return out
+
+    def delete(self, resume_id: str) -> None:
+        self._collection.delete(where={"resume_id": resume_id})
+
+    def reset(self) -> None:
+        # Drop the old collection if it exists, then recreate it fresh
+        try:
+            self._client.delete_collection("resumes")
+        except Exception:
+            pass
+        self._collection = self._open()
+
+
+# ── NumPy memory-mapped index (exact brute-force search) ─────────────────────
+
+class NumpyBackend:
+    """Embeddings in a memory-mapped (capacity × dim) array, stored as float16
+    or as int8 with a per-row scale; chunk text and metadata live in SQLite.
+
+    Search is an exact, blocked matrix-vector product over the live rows, so
+    only one block of vectors is decoded to float32 at a time.
+    """
+
+    def __init__(self, path: Path, dtype: str = "float16", block_rows: int = 65536):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported vector index dtype: {dtype}")
+        self._dir = path
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._default_dtype = dtype
+        self._block_rows = max(1, block_rows)
+        self._lock = threading.RLock()
+        self._conn = _connect(self._dir / "chunks.sqlite3")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                resume_id TEXT NOT NULL,
+                document TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_resume ON chunks(resume_id);
+            """
+        )
+        self._conn.commit()
+        self._load()
+
+    # ── storage ───────────────────────────────────────────────────────────
+    @property
+    def _info_path(self) -> Path:
+        return self._dir / "index.json"
+
+    def _load(self) -> None:
+        info = {"dtype": self._default_dtype, "dim": 0, "capacity": 0}
+        if self._info_path.exists():
+            info.update(json.loads(self._info_path.read_text()))
+        # An existing index keeps the dtype it was built with
+        self._dtype = np.dtype(info["dtype"])
+        self._dim = int(info["dim"])
+        self._capacity = int(info["capacity"])
+        self._open_arrays()
+
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._resume_rows: dict[str, set[int]] = defaultdict(set)
+        for row, resume_id in self._conn.execute("SELECT row, resume_id FROM chunks"):
+            self._alive[row] = True
+            self._resume_rows[resume_id].add(row)
+        live = np.flatnonzero(self._alive)
+        self._next_row = int(live[-1]) + 1 if len(live) else 0
+        self._free = [int(r) for r in np.flatnonzero(~self._alive[: self._next_row])]
+
+    def _open_arrays(self) -> None:
+        self._vectors: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        if self._capacity == 0:
+            return
+        shape = (self._capacity, self._dim)
+        self._vectors = np.memmap(self._dir / "vectors.bin", dtype=self._dtype, mode="r+", shape=shape)
+        if self._dtype == np.int8:
+            self._scales = np.memmap(
+                self._dir / "scales.bin", dtype=np.float32, mode="r+", shape=(self._capacity,)
+            )
+
+    def _grow(self, rows_needed: int, dim: int) -> None:
+        if self._dim == 0:
+            self._dim = dim
+        elif dim != self._dim:
+            raise ValueError(
+                f"Embedding dimension changed ({self._dim} → {dim}); reset the vector index"
+            )
+        if rows_needed <= self._capacity:
+            return
+        capacity = max(rows_needed, self._capacity * 2, 1024)
+        self._flush()
+        self._vectors = self._scales = None  # release the maps before resizing
+        files = [(self._dir / "vectors.bin", self._dtype.itemsize * self._dim)]
+        if self._dtype == np.int8:
+            files.append((self._dir / "scales.bin", 4))
+        for path, row_bytes in files:
+            with open(path, "ab"):
+                pass
+            os.truncate(path, capacity * row_bytes)  # zero-filled, sparse on most filesystems
+        self._capacity = capacity
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self._open_arrays()
+        self._info_path.write_text(
+            json.dumps({"dtype": self._dtype.name, "dim": self._dim, "capacity": capacity})
+        )
+
+    def _flush(self) -> None:
+        for arr in (self._vectors, self._scales):
+            if arr is not None:
+                arr.flush()
+
+    def _encode(self, rows: np.ndarray, embeddings: np.ndarray) -> None:
+        vectors = _normalise(embeddings)
+        if self._dtype == np.int8:
+            # Symmetric per-row quantisation: q = round(v / scale), |q| ≤ 127
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._vectors[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales[rows] = scales
+        else:
+            self._vectors[rows] = vectors.astype(np.float16)
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self._scales is not None:
+            vectors *= self._scales[rows][:, None]
+        return vectors
+
+    def _similarities(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), self._block_rows):
+            block = rows[start : start + self._block_rows]
+            end = start + len(block)
+            # Contiguous runs (the common unfiltered case) read the map as a slice
+            if block[-1] - block[0] + 1 == len(block):
+                block = slice(int(block[0]), int(block[-1]) + 1)
+            scores[start:end] = np.asarray(self._vectors[block], dtype=np.float32) @ query
+            if self._scales is not None:
+                scores[start:end] *= self._scales[block]
+        return scores
+
+    def _rows_for(self, resume_ids: Optional[list[str]]) -> np.ndarray:
+        if resume_ids is None:
+            return np.flatnonzero(self._alive[: self._next_row])
+        rows = set().union(*(self._resume_rows.get(rid, set()) for rid in resume_ids))
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def _fetch(self, rows: list[int]) -> dict[int, tuple[str, str, dict]]:
+        found: dict[int, tuple[str, str, dict]] = {}
+        for start in range(0, len(rows), 500):
+            part = rows[start : start + 500]
+            marks = ",".join("?" * len(part))
+            for r in self._conn.execute(
+                f"SELECT row, id, document, metadata FROM chunks WHERE row IN ({marks})", part
+            ):
+                found[r["row"]] = (r["id"], r["document"], json.loads(r["metadata"]))
+        return found
+
+    # ── VectorBackend API ─────────────────────────────────────────────────
+    def count(self) -> int:
+        with self._lock:
+            return int(self._alive.sum())
+
+    def upsert(self, ids, documents, metadatas, embeddings) -> None:
+        if not ids:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            existing: dict[str, tuple[int, str]] = {}
+            for start in range(0, len(ids), 500):
+                part = ids[start : start + 500]
+                marks = ",".join("?" * len(part))
+                for r in self._conn.execute(
+                    f"SELECT id, row, resume_id FROM chunks WHERE id IN ({marks})", part
+                ):
+                    existing[r["id"]] = (r["row"], r["resume_id"])
+
+            rows: list[int] = []
+            for chunk_id in ids:
+                if chunk_id in existing:
+                    row, old_resume = existing[chunk_id]
+                    self._resume_rows[old_resume].discard(row)
+                elif self._free:
+                    row = self._free.pop()
+                else:
+                    row = self._next_row
+                    self._next_row += 1
+                rows.append(row)
+
+            row_arr = np.array(rows, dtype=np.int64)
+            self._grow(int(row_arr.max()) + 1, embeddings.shape[1])
+            self._encode(row_arr, embeddings)
+            self._flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (row, id, resume_id, document, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (row, chunk_id, meta["resume_id"], doc, json.dumps(meta))
+                    for row, chunk_id, doc, meta in zip(rows, ids, documents, metadatas)
+                ],
+            )
+            self._conn.commit()
+            self._alive[row_arr] = True
+            for row, meta in zip(rows, metadatas):
+                self._resume_rows[meta["resume_id"]].add(row)
+
+    def query(self, embedding, n_results, resume_ids=None):
+        query = _normalise(embedding).reshape(-1)
+        with self._lock:
+            rows = self._rows_for(resume_ids)
+            n = min(n_results, len(rows))
+            if n == 0:
+                return []
+            scores = self._similarities(rows, query)
+            top = np.argpartition(-scores, n - 1)[:n]
+            top = top[np.argsort(-scores[top])]
+            found = self._fetch([int(rows[i]) for i in top])
+        return [
+            (found[int(rows[i])][2], found[int(rows[i])][1], 1.0 - float(scores[i]))
+            for i in top
+            if int(rows[i]) in found
+        ]
+
+    def get(self, resume_ids=None, include_embeddings=False):
+        with self._lock:
+            rows = [int(r) for r in self._rows_for(resume_ids)]
+            found = self._fetch(rows)
+            rows = [r for r in rows if r in found]
+            out: dict[str, Any] = {
+                "ids": [found[r][0] for r in rows],
+                "documents": [found[r][1] for r in rows],
+                "metadatas": [found[r][2] for r in rows],
+            }
+            if include_embeddings:
+                out["embeddings"] = (
+                    self._decode(np.array(rows, dtype=np.int64))
+                    if rows
+                    else np.zeros((0, self._dim), dtype=np.float32)
+                )
+        return out
+
+    def delete(self, resume_id: str) -> None:
+        with self._lock:
+            rows = self._resume_rows.pop(resume_id, set())
+            self._conn.execute("DELETE FROM chunks WHERE resume_id = ?", (resume_id,))
+            self._conn.commit()
+            for row in rows:
+                self._alive[row] = False
+                self._free.append(row)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._vectors = self._scales = None
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+            for name in ("vectors.bin", "scales.bin", "index.json"):
+                (self._dir / name).unlink(missing_ok=True)
+            self._load()
@@ -1,133 +1,497 @@
 from __future__ import annotations
 
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+import threading
+from collections import defaultdict
+from typing import Optional
 
-from app.config import CHROMA_DIR, EMBEDDING_MODEL
+import numpy as np
 
-# Singleton client / collection
-_client: chromadb.ClientAPI | None = None
-_collection: chromadb.Collection | None = None
+from app.bm25 import BM25Index, reciprocal_rank_fusion
+from app.cache import CachedEmbeddingFunction
+from app.chunking import FIXED_MAX_CHARS, FIXED_OVERLAP, get_chunker
+from app.config import (
+    CHROMA_DIR,
+    EMBED_BATCH_SIZE,
+    EMBEDDING_MODEL,
+    HYBRID_SEARCH,
+    RANK_STRATEGY,
+    RANK_TOP_K,
+    RRF_K,
+    VECTOR_BACKEND,
+    VECTOR_INDEX_DIR,
+    VECTOR_INDEX_DTYPE,
+    VECTOR_SEARCH_BLOCK_ROWS,
+)
+from app.vector_backends import ChromaBackend, NumpyBackend, VectorBackend
 
+# Singleton backend (Chroma collection or NumPy memmap index)
+_backend: VectorBackend | None = None
+_embedding_fn: CachedEmbeddingFunction | None = None
+_bm25: BM25Index | None = None
+_bm25_lock = threading.Lock()
+_chunk_matrix: "ChunkMatrix | None" = None
+_chunk_matrix_lock = threading.Lock()
 
-def _get_embedding_fn() -> SentenceTransformerEmbeddingFunction:
-    return SentenceTransformerEmbeddingFunction(
-        model_name=EMBEDDING_MODEL,
-    )
 
+class SentenceTransformerEmbedder:
+    """Embeds documents with a sentence-transformers model (loaded on first use)."""
 
-def get_collection() -> chromadb.Collection:
-    global _client, _collection
-    if _collection is None:
-        _client = chromadb.PersistentClient(
-            path=str(CHROMA_DIR),
-            settings=Settings(anonymized_telemetry=False),
-        )
-        _collection = _client.get_or_create_collection(
-            name="resumes",
-            embedding_function=_get_embedding_fn(),
-            metadata={"hnsw:space": "cosine"},
+    def __init__(self, model_name: str):
+        self._model_name = model_name
+        self._model = None
+
+    def __call__(self, input: list[str]) -> list[np.ndarray]:
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self._model_name)
+        # Same (unnormalised) vectors Chroma's SentenceTransformerEmbeddingFunction
+        # produced, so existing embedding-cache entries stay valid
+        return list(self._model.encode(list(input), convert_to_numpy=True))
+
+
+def _get_embedding_fn() -> CachedEmbeddingFunction:
+    # Chunk vectors are cached by content hash, so re-ingesting is a lookup
+    global _embedding_fn
+    if _embedding_fn is None:
+        _embedding_fn = CachedEmbeddingFunction(
+            SentenceTransformerEmbedder(EMBEDDING_MODEL),
+            model_name=EMBEDDING_MODEL,
         )
-    return _collection
+    return _embedding_fn
+
+
+def embed_texts(texts: list[str]) -> list:
+    return list(_get_embedding_fn()(texts))
 
 
-def _chunk_text(text: str, max_chars: int = 2000, overlap: int = 200) -> list[str]:
-    chunks: list[str] = []
-    start = 0
-    while start < len(text):
-        end = start + max_chars
-        chunks.append(text[start:end])
-        start += max_chars - overlap
-    return chunks
+def get_backend() -> VectorBackend:
+    global _backend
+    if _backend is None:
+        if VECTOR_BACKEND == "chroma":
+            _backend = ChromaBackend(CHROMA_DIR, embedding_function=_get_embedding_fn())
+        elif VECTOR_BACKEND == "numpy":
+            _backend = NumpyBackend(
+                VECTOR_INDEX_DIR, dtype=VECTOR_INDEX_DTYPE, block_rows=VECTOR_SEARCH_BLOCK_ROWS
+            )
+        else:
+            raise ValueError(f"Unknown vector backend: {VECTOR_BACKEND}")
+    return _backend
+
+
+def _get_bm25() -> BM25Index:
+    # Built lazily from the persisted chunks, then kept in sync on add/delete
+    global _bm25
+    with _bm25_lock:
+        if _bm25 is None:
+            index = BM25Index()
+            results = get_backend().get()
+            grouped: dict[str, list[tuple[dict, str]]] = defaultdict(list)
+            for meta, doc in zip(results["metadatas"], results["documents"]):
+                grouped[meta["resume_id"]].append((meta, doc))
+            for rid, parts in grouped.items():
+                index.add(rid, parts[0][0]["filename"], rebuild_text(parts))
+            _bm25 = index
+    return _bm25
+
+
+def rebuild_text(parts: list[tuple[dict, str]]) -> str:
+    """Stitch (metadata, chunk) pairs back into the original text, dropping overlaps."""
+    parts = sorted(parts, key=lambda p: p[0].get("chunk_index", 0))
+    text = ""
+    for meta, chunk in parts:
+        # Older chunks have no char_start; they used the fixed 2000/200 window
+        start = meta.get(
+            "char_start", meta.get("chunk_index", 0) * (FIXED_MAX_CHARS - FIXED_OVERLAP)
+        )
+        text += chunk[max(0, len(text) - start) :]
+    return text
 
 
 def add_resume(resume_id: str, filename: str, text: str) -> int:
-    col = get_collection()
-    chunks = _chunk_text(text)
-    ids = [f"{resume_id}_chunk_{i}" for i in range(len(chunks))]
-    metadatas = [
-        {"resume_id": resume_id, "filename": filename, "chunk_index": i}
-        for i in range(len(chunks))
-    ]
-    col.upsert(ids=ids, documents=chunks, metadatas=metadatas)
-    return len(chunks)
-
-
-def query_resumes(jd_text: str, top_n: int = 5) -> list[dict]:
-    col = get_collection()
-    # Query more chunks to ensure we get enough unique resumes
-    results = col.query(
-        query_texts=[jd_text],
-        n_results=top_n * 5,
-        include=["documents", "metadatas", "distances"],
-    )
+    return add_resumes([(resume_id, filename, text)])[resume_id]
+
+
+def add_resumes(
+    resumes: list[tuple[str, str, str]],
+    batch_size: int = EMBED_BATCH_SIZE,
+    update_keyword_index: bool = True,
+) -> dict[str, int]:
+    """Chunk many (resume_id, filename, text) triples and upsert in large batches."""
+    backend = get_backend()
+    ids: list[str] = []
+    documents: list[str] = []
+    metadatas: list[dict] = []
+    counts: dict[str, int] = {}
+    # Chunk every document in one batched pass (tokenizer calls are vectorised)
+    all_chunks = get_chunker().chunk_many([text for _, _, text in resumes])
+    for (resume_id, filename, _), chunks in zip(resumes, all_chunks):
+        counts[resume_id] = len(chunks)
+        for i, chunk in enumerate(chunks):
+            ids.append(f"{resume_id}_chunk_{i}")
+            documents.append(chunk.text)
+            metadatas.append(
+                {
+                    "resume_id": resume_id,
+                    "filename": filename,
+                    "chunk_index": i,
+                    "chunk_count": len(chunks),
+                    "char_start": chunk.start,
+                    "section": chunk.section,
+                }
+            )
 
-    seen: set[str] = set()
+    # One embedding forward pass + upsert per batch instead of per resume
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        backend.upsert(
+            ids[start:end],
+            documents[start:end],
+            metadatas[start:end],
+            np.asarray(embed_texts(documents[start:end]), dtype=np.float32),
+        )
+
+    _invalidate_chunk_matrix()
+    # Offline ingestion skips this; the server rebuilds BM25 from Chroma on start
+    if update_keyword_index:
+        index = _get_bm25()
+        for resume_id, filename, text in resumes:
+            index.add(resume_id, filename, text)
+    return counts
+
+
+def _aggregate(chunk_scores: list[float], chunk_count: int, strategy: str, top_k: int) -> float:
+    # chunk_scores is sorted best-first
+    if strategy == "max":
+        return chunk_scores[0]
+    if strategy == "mean_top_k":
+        best = chunk_scores[:top_k]
+        return sum(best) / len(best)
+    if strategy == "coverage":
+        # Best chunk, boosted by how much of the resume matched the query
+        coverage = sum(chunk_scores) / max(chunk_count, len(chunk_scores))
+        return 0.7 * chunk_scores[0] + 0.3 * coverage
+    raise ValueError(f"Unknown ranking strategy: {strategy}")
+
+
+def _all_chunk_scores(
+    backend: VectorBackend, query: np.ndarray, resume_ids: list[str]
+) -> dict[str, list[float]]:
+    """Cosine similarity of ``query`` to every chunk of each resume, best-first."""
+    if not resume_ids:
+        return {}
+    results = backend.get(resume_ids, include_embeddings=True)
+    vectors = np.asarray(results["embeddings"], dtype=np.float32)
+    if not len(vectors):
+        return {}
+    norms = np.linalg.norm(vectors, axis=1)
+    sims = vectors @ (query / (np.linalg.norm(query) or 1)) / np.where(norms == 0, 1, norms)
+    grouped: dict[str, list[float]] = defaultdict(list)
+    for meta, sim in zip(results["metadatas"], sims.tolist()):
+        grouped[meta["resume_id"]].append(sim)
+    return {rid: sorted(scores, reverse=True) for rid, scores in grouped.items()}
+
+
+def best_chunks(query_text: str, resume_ids: list[str], per_resume: int) -> dict[str, list[str]]:
+    """Each resume's ``per_resume`` chunks most similar to ``query_text``, best-first."""
+    if not resume_ids:
+        return {}
+    query = np.asarray(embed_texts([query_text])[0], dtype=np.float32)
+    results = get_backend().get(resume_ids, include_embeddings=True)
+    vectors = np.asarray(results["embeddings"], dtype=np.float32)
+    if not len(vectors):
+        return {}
+    norms = np.linalg.norm(vectors, axis=1)
+    sims = vectors @ query / np.where(norms == 0, 1, norms)
+    grouped: dict[str, list[tuple[float, str]]] = defaultdict(list)
+    for meta, doc, sim in zip(results["metadatas"], results["documents"], sims.tolist()):
+        grouped[meta["resume_id"]].append((sim, doc))
+    return {
+        rid: [doc for _, doc in sorted(parts, key=lambda p: p[0], reverse=True)[:per_resume]]
+        for rid, parts in grouped.items()
+    }
+
+
+def dense_search(
+    jd_text: str,
+    top_n: int,
+    resume_ids: Optional[list[str]] = None,
+    strategy: str = RANK_STRATEGY,
+    top_k: int = RANK_TOP_K,
+) -> list[dict]:
+    """Rank resumes (not chunks): fetch chunk candidates, then aggregate per resume."""
+    backend = get_backend()
+    total_chunks = backend.count()
+    if total_chunks == 0:
+        return []
+    query = np.asarray(embed_texts([jd_text])[0], dtype=np.float32)
+
+    # Stage 1: widen the chunk pool until top_n distinct resumes are covered
+    # (optionally restricted to a subset of the resume pool)
+    n_results = min(top_n * 5, total_chunks)
+    while True:
+        hits: dict[str, dict] = {}
+        for meta, doc, dist in backend.query(query, n_results, resume_ids):
+            rid = meta["resume_id"]
+            entry = hits.setdefault(
+                rid,
+                {
+                    "resume_id": rid,
+                    "filename": meta["filename"],
+                    "chunk_count": meta.get("chunk_count", 0),
+                    "chunk_scores": [],
+                    "text": doc,  # best-matching chunk (results are sorted)
+                },
+            )
+            entry["chunk_scores"].append(1 - dist)  # cosine → similarity
+        if len(hits) >= top_n or n_results >= total_chunks:
+            break
+        n_results = min(n_results * 2, total_chunks)
+
+    # Stage 2: mean_top_k/coverage need every chunk of a resume, not just the
+    # ones that landed in the pool → rescore the candidates' chunks exactly
+    all_scores = _all_chunk_scores(backend, query, list(hits)) if strategy != "max" else {}
+
+    # Stage 3: score each resume from its chunk similarities
     ranked: list[dict] = []
+    for entry in hits.values():
+        matched = len(entry["chunk_scores"])
+        scores = all_scores.get(entry["resume_id"]) or entry.pop("chunk_scores")
+        entry.pop("chunk_scores", None)
+        chunk_count = max(entry.pop("chunk_count"), len(scores))
+        entry["score"] = _aggregate(scores, chunk_count, strategy, top_k)
+        entry["breakdown"] = {
+            "strategy": strategy,
+            "max": scores[0],
+            "mean_top_k": sum(scores[:top_k]) / len(scores[:top_k]),
+            "matched_chunks": matched,
+            "total_chunks": chunk_count,
+        }
+        ranked.append(entry)
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked[:top_n]
+
 
-    if not results["ids"] or not results["ids"][0]:
-        return ranked
+class ChunkMatrix:
+    """Every stored chunk embedding as one L2-normalised matrix, rows grouped by
+    resume, plus a padded (resume × chunk) index for per-resume aggregation."""
 
-    for idx, doc_id in enumerate(results["ids"][0]):
-        meta = results["metadatas"][0][idx]
-        rid = meta["resume_id"]
-        if rid in seen:
-            continue
-        seen.add(rid)
+    def __init__(self, embeddings: np.ndarray, metadatas: list[dict]):
+        order = sorted(range(len(metadatas)), key=lambda i: metadatas[i]["resume_id"])
+        vectors = np.asarray(embeddings, dtype=np.float32)[order]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms == 0, 1, norms)
+
+        self.resume_ids: list[str] = []
+        self.filenames: list[str] = []
+        self.chunk_counts: list[int] = []
+        groups: list[list[int]] = []
+        for row, i in enumerate(order):
+            meta = metadatas[i]
+            if not self.resume_ids or self.resume_ids[-1] != meta["resume_id"]:
+                self.resume_ids.append(meta["resume_id"])
+                self.filenames.append(meta["filename"])
+                self.chunk_counts.append(meta.get("chunk_count", 0))
+                groups.append([])
+            groups[-1].append(row)
+        width = max((len(g) for g in groups), default=0)
+        self.index = np.zeros((len(groups), width), dtype=np.int64)
+        self.valid = np.zeros((len(groups), width), dtype=bool)
+        for g, rows in enumerate(groups):
+            self.index[g, : len(rows)] = rows
+            self.valid[g, : len(rows)] = True
+
+
+def _get_chunk_matrix() -> ChunkMatrix:
+    # Built lazily from the persisted chunk embeddings; dropped on add/delete
+    global _chunk_matrix
+    with _chunk_matrix_lock:
+        if _chunk_matrix is None:
+            results = get_backend().get(include_embeddings=True)
+            _chunk_matrix = ChunkMatrix(results["embeddings"], results["metadatas"] or [])
+        return _chunk_matrix
+
+
+def _invalidate_chunk_matrix() -> None:
+    global _chunk_matrix
+    with _chunk_matrix_lock:
+        _chunk_matrix = None
+
+
+def match_many(
+    queries: list[str],
+    top_n: int,
+    resume_ids: Optional[list[str]] = None,
+    strategy: str = RANK_STRATEGY,
+    top_k: int = RANK_TOP_K,
+) -> list[list[dict]]:
+    """Rank resumes for many queries at once: one batched query embedding and
+    one (query × chunk) similarity matrix over every stored chunk.
+
+    Exact (brute-force) scores, so ``coverage`` sees all of a resume's chunks
+    rather than just the ones an ANN query happened to return.
+    """
+    matrix = _get_chunk_matrix()
+    if not queries or not matrix.resume_ids:
+        return [[] for _ in queries]
+
+    q = np.asarray(embed_texts(queries), dtype=np.float32)
+    norms = np.linalg.norm(q, axis=1, keepdims=True)
+    q /= np.where(norms == 0, 1, norms)
+    sims = q @ matrix.vectors.T  # (queries, chunks) cosine similarity
+
+    # (queries, resumes, chunks-per-resume), padding pushed to -inf
+    grouped = np.where(matrix.valid, sims[:, matrix.index], -np.inf)
+    ordered = -np.sort(-grouped, axis=2)
+    counts = matrix.valid.sum(axis=1)
+    k = min(top_k, ordered.shape[2])
+    best = ordered[:, :, 0]
+    mean_top_k = np.where(
+        np.isfinite(ordered[:, :, :k]), ordered[:, :, :k], 0
+    ).sum(axis=2) / np.minimum(counts, k)
+    if strategy == "max":
+        scores = best
+    elif strategy == "mean_top_k":
+        scores = mean_top_k
+    elif strategy == "coverage":
+        total = np.maximum(np.asarray(matrix.chunk_counts), counts)
+        coverage = np.where(matrix.valid, grouped, 0).sum(axis=2) / total
+        scores = 0.7 * best + 0.3 * coverage
+    else:
+        raise ValueError(f"Unknown ranking strategy: {strategy}")
+
+    # Optionally restrict to a subset of the resume pool
+    if resume_ids:
+        allowed = set(resume_ids)
+        mask = np.array([rid in allowed for rid in matrix.resume_ids])
+        scores = np.where(mask, scores, -np.inf)
+        available = int(mask.sum())
+    else:
+        available = len(matrix.resume_ids)
+    n = min(top_n, available)
+
+    ranked: list[list[dict]] = []
+    for qi in range(len(queries)):
+        top = np.argpartition(-scores[qi], n - 1)[:n] if n else np.array([], dtype=int)
+        top = top[np.argsort(-scores[qi][top])]
         ranked.append(
-            {
-                "resume_id": rid,
-                "filename": meta["filename"],
-                "score": 1 - results["distances"][0][idx],  # cosine → similarity
-                "text": results["documents"][0][idx],
-            }
+            [
+                {
+                    "resume_id": matrix.resume_ids[g],
+                    "filename": matrix.filenames[g],
+                    "text": "",
+                    "score": float(scores[qi, g]),
+                    "breakdown": {
+                        "strategy": strategy,
+                        "max": float(best[qi, g]),
+                        "mean_top_k": float(mean_top_k[qi, g]),
+                        "matched_chunks": int(counts[g]),
+                        "total_chunks": max(matrix.chunk_counts[g], int(counts[g])),
+                    },
+                }
+                for g in top
+            ]
         )
-        if len(ranked) >= top_n:
-            break
+    return ranked
+
 
+def fuse_keyword_hits(
+    dense: list[dict],
+    query: str,
+    top_n: int,
+    resume_ids: Optional[list[str]] = None,
+) -> list[dict]:
+    """Fuse a dense ranking with BM25 hits for ``query`` by reciprocal rank."""
+    index = _get_bm25()
+    lexical = index.search(query, max(top_n, len(dense)), allowed=resume_ids)
+    fused = reciprocal_rank_fusion(
+        [[r["resume_id"] for r in dense], [rid for rid, _ in lexical]],
+        k=RRF_K,
+    )
+
+    dense_by_id = {r["resume_id"]: r for r in dense}
+    bm25_scores = dict(lexical)
+    ranked: list[dict] = []
+    for rid, fused_score in sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:top_n]:
+        entry = dense_by_id.get(rid) or {
+            "resume_id": rid,
+            "filename": index.filename(rid),
+            "text": "",
+            "breakdown": {},
+        }
+        entry["breakdown"]["dense"] = entry.get("score")
+        entry["breakdown"]["bm25"] = bm25_scores.get(rid)
+        entry["score"] = fused_score
+        ranked.append(entry)
     return ranked
 
 
+def query_resumes(
+    jd_text: str,
+    top_n: int = 5,
+    resume_ids: Optional[list[str]] = None,
+    strategy: str = RANK_STRATEGY,
+    top_k: int = RANK_TOP_K,
+    keywords: Optional[list[str]] = None,
+    hybrid: bool = HYBRID_SEARCH,
+) -> list[dict]:
+    if not hybrid:
+        return dense_search(jd_text, top_n, resume_ids, strategy, top_k)
+
+    # Dense + BM25 candidate lists (wider than top_n), fused by reciprocal rank
+    dense = dense_search(jd_text, top_n * 2, resume_ids, strategy, top_k)
+    return fuse_keyword_hits(dense, " ".join([jd_text, *(keywords or [])]), top_n, resume_ids)
+
+
 def get_full_resume_text(resume_id: str) -> str:
-    col = get_collection()
-    results = col.get(
-        where={"resume_id": resume_id},
-        include=["documents", "metadatas"],
-    )
-    if not results["ids"]:
-        return ""
+    return get_full_resume_texts([resume_id]).get(resume_id, "")
 
-    # Sort by chunk_index and join
-    pairs = sorted(
-        zip(results["metadatas"], results["documents"]),
-        key=lambda p: p[0].get("chunk_index", 0),
-    )
-    return " ".join(doc for _, doc in pairs)
+
+def get_full_resume_texts(resume_ids: list[str]) -> dict[str, str]:
+    """Rebuild many resumes' text from their chunks with a single store query."""
+    if not resume_ids:
+        return {}
+    results = get_backend().get(resume_ids)
+    grouped: dict[str, list[tuple[dict, str]]] = defaultdict(list)
+    for meta, doc in zip(results["metadatas"], results["documents"]):
+        grouped[meta["resume_id"]].append((meta, doc))
+    return {rid: rebuild_text(parts) for rid, parts in grouped.items()}
+
+
+def get_resume_chunks(resume_ids: list[str]) -> dict[str, list[dict]]:
+    """Stored chunks (text, metadata, embedding) per resume, in chunk order."""
+    if not resume_ids:
+        return {}
+    results = get_backend().get(resume_ids, include_embeddings=True)
+    grouped: dict[str, list[dict]] = defaultdict(list)
+    for meta, doc, emb in zip(results["metadatas"], results["documents"], results["embeddings"]):
+        grouped[meta["resume_id"]].append({"text": doc, "metadata": meta, "embedding": emb})
+    for chunks in grouped.values():
+        chunks.sort(key=lambda c: c["metadata"].get("chunk_index", 0))
+    return dict(grouped)
 
 
 def delete_resume(resume_id: str) -> None:
-    col = get_collection()
-    results = col.get(where={"resume_id": resume_id})
-    if results["ids"]:
-        col.delete(ids=results["ids"])
+    delete_resumes([resume_id])
+
+
+def delete_resumes(resume_ids: list[str]) -> None:
+    """Drop every chunk of these resumes (also undoes a partially failed add)."""
+    backend = get_backend()
+    for resume_id in resume_ids:
+        backend.delete(resume_id)
+    # A keyword index that isn't built yet is rebuilt from the backend anyway
+    with _bm25_lock:
+        index = _bm25
+    if index is not None:
+        for resume_id in resume_ids:
+            index.remove(resume_id)
+    _invalidate_chunk_matrix()
 
 
 def reset_collection() -> None:
-    global _client, _collection
-    if _client is None:
-        _client = chromadb.PersistentClient(
-            path=str(CHROMA_DIR),
-            settings=Settings(anonymized_telemetry=False),
-        )
-    # Drop the old collection if it exists
-    try:
-        _client.delete_collection("resumes")
-    except Exception:
-        pass
-    # Recreate it fresh
-    _collection = _client.get_or_create_collection(
-        name="resumes",
-        embedding_function=_get_embedding_fn(),
-        metadata={"hnsw:space": "cosine"},
-    )
+    global _bm25
+    get_backend().reset()
+    with _bm25_lock:
+        _bm25 = None
+    _invalidate_chunk_matrix()
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from app.dedup import NearDuplicateIndex, jaccard, minhash, shingles
+from app.models import DocumentMeta
+from app.store import DocumentStore
+
+RESUME = (
+    "Jane Doe, senior data engineer. Eight years building batch and streaming "
+    "pipelines with PySpark, Kafka and Airflow on AWS. Led the migration of a "
+    "legacy Hadoop warehouse to Delta Lake, cutting nightly job time by 60 percent. "
+    "Mentored four engineers and introduced data quality checks with Great "
+    "Expectations across 120 tables. BSc Computer Science, University of Leeds."
+)
+UNRELATED = (
+    "Pastry chef with a decade in Parisian patisseries, specialising in laminated "
+    "doughs, tempered chocolate work and plated desserts for tasting menus of up "
+    "to ninety covers. Runs a team of six and manages seasonal menu costing."
+)
+
+
+def edited(text: str) -> str:
+    # Reformatted copy with a changed phone line and one extra sentence
+    return text.upper().replace(",", " ;") + " Phone: 555 0100."
+
+
+@pytest.fixture
+def db(tmp_path):
+    return tmp_path / "state.sqlite3"
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("Data, Engineer! Spark", size=2) == shingles("data engineer spark", size=2)
+    assert shingles("", size=3) == set()
+
+
+def test_minhash_estimates_jaccard():
+    a, b = shingles(RESUME), shingles(edited(RESUME))
+    true = len(a & b) / len(a | b)
+    assert jaccard(minhash(RESUME), minhash(edited(RESUME))) == pytest.approx(true, abs=0.12)
+    assert jaccard(minhash(RESUME), minhash(UNRELATED)) < 0.1
+
+
+def test_minhash_is_stable_across_calls():
+    assert np.array_equal(minhash(RESUME), minhash(RESUME))
+
+
+def test_near_duplicate_links_to_canonical(db):
+    index = NearDuplicateIndex(db)
+    assert index.find_or_add("original", RESUME) is None
+    assert index.find_or_add("copy", edited(RESUME)) == "original"
+    assert index.find_or_add("chef", UNRELATED) is None
+
+
+def test_threshold_rejects_partial_overlap(db):
+    index = NearDuplicateIndex(db, threshold=0.85)
+    index.find_or_add("original", RESUME)
+    half = RESUME[: len(RESUME) // 2] + " " + UNRELATED
+    assert index.find_or_add("half", half) is None
+
+
+def test_duplicates_are_not_indexed_as_canonical(db):
+    index = NearDuplicateIndex(db)
+    index.find_or_add("original", RESUME)
+    index.find_or_add("copy", edited(RESUME))
+    # A third copy still resolves to the original, never to another copy
+    assert index.find_or_add("copy2", RESUME + " References on request.") == "original"
+
+
+def test_signatures_persist_across_instances(db):
+    NearDuplicateIndex(db).find_or_add("original", RESUME)
+    assert NearDuplicateIndex(db).find_or_add("copy", edited(RESUME)) == "original"
+
+
+def test_removed_resume_is_no_longer_matched(db):
+    index = NearDuplicateIndex(db)
+    index.find_or_add("original", RESUME)
+    index.remove(["original"])
+    assert index.find_or_add("copy", edited(RESUME)) is None
+    assert NearDuplicateIndex(db).find_or_add("copy2", RESUME) == "copy"
+
+
+def test_prune_orphans_drops_signatures_without_documents(db):
+    documents = DocumentStore(db)
+    stored = DocumentMeta(filename="jane.pdf", doc_type="resume", text=RESUME)
+    documents.put(stored)
+    index = NearDuplicateIndex(db)
+    index.find_or_add(stored.id, RESUME)
+    index.find_or_add("never-stored", UNRELATED)
+
+    assert index.prune_orphans() == 1
+    assert index.find_or_add("chef", UNRELATED) is None
+    assert index.find_or_add("copy", edited(RESUME)) == stored.id
+
+
+def test_clear_forgets_everything(db):
+    index = NearDuplicateIndex(db)
+    index.find_or_add("original", RESUME)
+    index.clear()
+    assert index.find_or_add("copy", edited(RESUME)) is None
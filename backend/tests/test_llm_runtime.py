@@ -0,0 +1,167 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import llm_runtime
+from app.llm_runtime import LLMScheduler, Priority
+
+
+class FakeCrew:
+    """Stands in for a crewai Crew: kickoff() blocks for ``seconds``."""
+
+    def __init__(self, name="", seconds=0.05, log=None, error=None):
+        self.name = name
+        self.seconds = seconds
+        self.log = log
+        self.error = error
+
+    def kickoff(self):
+        time.sleep(self.seconds)
+        if self.log is not None:
+            self.log.append(self.name)
+        if self.error is not None:
+            error, self.error = self.error, None  # fail once
+            raise error
+        return self.name
+
+
+@pytest.fixture(autouse=True)
+def executor(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(llm_runtime, "_executor", pool)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def scheduler(concurrency=2):
+    return LLMScheduler(concurrency, rpm=10_000, tpm=10_000_000)
+
+
+def test_queued_calls_are_served_by_priority():
+    async def main():
+        sched, log = scheduler(concurrency=1), []
+        blocker = asyncio.create_task(sched.run(FakeCrew("blocker", 0.2, log)))
+        await asyncio.sleep(0.05)
+        calls = [
+            asyncio.create_task(sched.run(FakeCrew(p.name, 0.01, log), priority=p))
+            for p in (Priority.BACKGROUND, Priority.BULK, Priority.INTERACTIVE)
+        ]
+        await asyncio.gather(blocker, *calls)
+        return log
+
+    assert asyncio.run(main()) == ["blocker", "INTERACTIVE", "BULK", "BACKGROUND"]
+
+
+def test_cancelled_call_holds_its_slot_until_the_thread_finishes():
+    async def main():
+        sched = scheduler()
+        calls = [asyncio.create_task(sched.run(FakeCrew(seconds=0.5))) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        for call in calls:
+            call.cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        running_after_cancel = sched.stats()["running"]
+        # Their timeout must not count the wait for the busy worker threads
+        results = await asyncio.gather(
+            *(sched.run(FakeCrew("ok", 0.2), timeout=0.4) for _ in range(2))
+        )
+        return running_after_cancel, results, sched.stats()["running"]
+
+    running_after_cancel, results, running = asyncio.run(main())
+    assert running_after_cancel == 2
+    assert results == ["ok", "ok"]
+    assert running == 0
+
+
+def test_timeout_raises_but_keeps_slot_until_worker_returns():
+    async def main():
+        sched = scheduler()
+        with pytest.raises(TimeoutError):
+            await sched.run(FakeCrew(seconds=0.3), timeout=0.05)
+        during = sched.stats()["running"]
+        await asyncio.sleep(0.4)
+        return during, sched.stats()
+
+    during, stats = asyncio.run(main())
+    assert during == 1
+    assert stats["running"] == 0
+    assert stats["failed"] == 1
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def main():
+        sched = scheduler(concurrency=1)
+        blocker = asyncio.create_task(sched.run(FakeCrew(seconds=0.1)))
+        await asyncio.sleep(0.02)
+        waiter = asyncio.create_task(sched.run(FakeCrew(seconds=0.01)))
+        await asyncio.sleep(0.02)
+        waiter.cancel()
+        await asyncio.gather(blocker, waiter, return_exceptions=True)
+        await asyncio.sleep(0.05)
+        return sched.stats()
+
+    stats = asyncio.run(main())
+    assert stats["running"] == 0
+    assert sum(stats["queue_depth"].values()) == 0
+
+
+def test_rate_limited_call_is_retried(monkeypatch):
+    monkeypatch.setattr(llm_runtime, "LLM_BACKOFF_BASE_SECONDS", 0.01)
+
+    async def main():
+        sched = scheduler()
+        crew = FakeCrew("done", 0.01, error=RuntimeError("429 Too Many Requests"))
+        return await sched.run(crew), sched.stats()
+
+    result, stats = asyncio.run(main())
+    assert result == "done"
+    assert stats["retries"] == 1
+    assert stats["completed"] == 1
+
+
+def test_non_rate_limit_errors_are_not_retried():
+    async def main():
+        sched = scheduler()
+        with pytest.raises(ValueError):
+            await sched.run(FakeCrew(error=ValueError("bad prompt")))
+        return sched.stats()
+
+    stats = asyncio.run(main())
+    assert stats["retries"] == 0
+    assert stats["failed"] == 1
+
+
+def test_promoted_job_jumps_the_queue_including_child_tasks():
+    async def main():
+        sched, log = scheduler(concurrency=1), []
+
+        async def draft():
+            with sched.job("draft"):
+                # Calls from child tasks belong to the same job
+                await asyncio.gather(
+                    sched.run(FakeCrew("draft", 0.01, log), priority=Priority.BACKGROUND)
+                )
+
+        blocker = asyncio.create_task(sched.run(FakeCrew("blocker", 0.2, log)))
+        await asyncio.sleep(0.05)
+        bulk = asyncio.create_task(sched.run(FakeCrew("bulk", 0.01, log), priority=Priority.BULK))
+        drafting = asyncio.create_task(draft())
+        await asyncio.sleep(0.05)
+        sched.promote("draft", Priority.INTERACTIVE)
+        await asyncio.gather(blocker, bulk, drafting)
+        return log, sched.stats()
+
+    log, stats = asyncio.run(main())
+    assert log == ["blocker", "draft", "bulk"]
+    assert stats["running"] == 0
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = llm_runtime.TokenBucket(per_minute=60)
+    assert bucket.wait_time(10) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(30) == pytest.approx(30, rel=0.05)
+    # Requests larger than the bucket go through once it is full
+    assert bucket.wait_time(1000) == pytest.approx(60, rel=0.05)
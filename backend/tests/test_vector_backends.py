@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+
+from app.vector_backends import NumpyBackend
+
+DIM = 16
+
+
+def make_chunks(rng, resume_id, n, start=0):
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    ids = [f"{resume_id}_chunk_{i}" for i in range(start, start + n)]
+    docs = [f"{resume_id} text {i}" for i in range(start, start + n)]
+    metas = [
+        {"resume_id": resume_id, "filename": f"{resume_id}.pdf", "chunk_index": i}
+        for i in range(start, start + n)
+    ]
+    return ids, docs, metas, vectors
+
+
+@pytest.fixture(params=["float16", "int8"])
+def dtype(request):
+    return request.param
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+
+def test_query_returns_exact_nearest_chunks(tmp_path, dtype, rng):
+    backend = NumpyBackend(tmp_path, dtype=dtype)
+    ids, docs, metas, vectors = make_chunks(rng, "r1", 50)
+    backend.upsert(ids, docs, metas, vectors)
+
+    probe = vectors[17]
+    hits = backend.query(probe, 5)
+    assert hits[0][1] == "r1 text 17"
+    assert hits[0][2] == pytest.approx(0.0, abs=0.02)  # cosine distance to itself
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ (probe / np.linalg.norm(probe))))[:5]
+    assert [doc for _, doc, _ in hits] == [f"r1 text {i}" for i in expected]
+    distances = [d for _, _, d in hits]
+    assert distances == sorted(distances)
+
+
+def test_query_filters_by_resume(tmp_path, dtype, rng):
+    backend = NumpyBackend(tmp_path, dtype=dtype)
+    for rid in ("a", "b", "c"):
+        backend.upsert(*make_chunks(rng, rid, 4))
+    hits = backend.query(rng.standard_normal(DIM), 10, resume_ids=["b"])
+    assert len(hits) == 4
+    assert {meta["resume_id"] for meta, _, _ in hits} == {"b"}
+    assert backend.query(rng.standard_normal(DIM), 10, resume_ids=["missing"]) == []
+
+
+def test_upsert_replaces_existing_ids(tmp_path, dtype, rng):
+    backend = NumpyBackend(tmp_path, dtype=dtype)
+    ids, docs, metas, vectors = make_chunks(rng, "r1", 3)
+    backend.upsert(ids, docs, metas, vectors)
+    backend.upsert(ids[:1], ["rewritten"], metas[:1], vectors[:1] * -1)
+    assert backend.count() == 3
+    assert "rewritten" in backend.get(["r1"])["documents"]
+
+
+def test_deleted_rows_are_reused(tmp_path, dtype, rng):
+    backend = NumpyBackend(tmp_path, dtype=dtype)
+    backend.upsert(*make_chunks(rng, "old", 8))
+    backend.upsert(*make_chunks(rng, "keep", 8))
+    size = (tmp_path / "vectors.bin").stat().st_size
+
+    backend.delete("old")
+    assert backend.count() == 8
+    assert backend.get(["old"])["ids"] == []
+
+    ids, docs, metas, vectors = make_chunks(rng, "new", 8)
+    backend.upsert(ids, docs, metas, vectors)
+    assert backend.count() == 16
+    assert (tmp_path / "vectors.bin").stat().st_size == size
+    assert backend.query(vectors[3], 1)[0][1] == "new text 3"
+    assert {m["resume_id"] for m in backend.get()["metadatas"]} == {"keep", "new"}
+
+
+def test_grows_past_initial_capacity(tmp_path, dtype, rng):
+    backend = NumpyBackend(tmp_path, dtype=dtype)
+    ids, docs, metas, vectors = make_chunks(rng, "big", 2500)
+    for start in range(0, 2500, 700):
+        end = start + 700
+        backend.upsert(ids[start:end], docs[start:end], metas[start:end], vectors[start:end])
+    assert backend.count() == 2500
+    assert backend.query(vectors[2400], 1)[0][1] == "big text 2400"
+
+
+def test_reopen_restores_index_and_free_rows(tmp_path, dtype, rng):
+    backend = NumpyBackend(tmp_path, dtype=dtype)
+    backend.upsert(*make_chunks(rng, "a", 6))
+    ids, docs, metas, vectors = make_chunks(rng, "b", 6)
+    backend.upsert(ids, docs, metas, vectors)
+    backend.delete("a")
+    size = (tmp_path / "vectors.bin").stat().st_size
+    del backend
+
+    # The stored dtype wins over the one passed on reopen
+    reopened = NumpyBackend(tmp_path, dtype="int8" if dtype == "float16" else "float16")
+    assert reopened.count() == 6
+    assert reopened.query(vectors[2], 1)[0][1] == "b text 2"
+
+    reopened.upsert(*make_chunks(rng, "c", 6))
+    assert reopened.count() == 12
+    assert (tmp_path / "vectors.bin").stat().st_size == size
+
+
+def test_get_returns_normalised_embeddings(tmp_path, dtype, rng):
+    backend = NumpyBackend(tmp_path, dtype=dtype)
+    ids, docs, metas, vectors = make_chunks(rng, "r1", 5)
+    backend.upsert(ids, docs, metas, vectors)
+    out = backend.get(["r1"], include_embeddings=True)
+    by_id = dict(zip(out["ids"], out["embeddings"]))
+    for chunk_id, vector in zip(ids, vectors):
+        unit = vector / np.linalg.norm(vector)
+        assert np.allclose(by_id[chunk_id], unit, atol=0.02)
+
+
+def test_dimension_change_requires_reset(tmp_path, rng):
+    backend = NumpyBackend(tmp_path)
+    backend.upsert(*make_chunks(rng, "r1", 2))
+    with pytest.raises(ValueError):
+        backend.upsert(["x"], ["x"], [{"resume_id": "x"}], np.ones((1, DIM + 1)))
+
+    backend.reset()
+    assert backend.count() == 0
+    backend.upsert(["x"], ["x"], [{"resume_id": "x"}], np.ones((1, DIM + 1)))
+    assert backend.count() == 1
+
+
+def test_small_search_blocks_match_one_block(tmp_path, rng):
+    ids, docs, metas, vectors = make_chunks(rng, "r1", 300)
+    whole = NumpyBackend(tmp_path / "whole")
+    blocked = NumpyBackend(tmp_path / "blocked", block_rows=7)
+    for backend in (whole, blocked):
+        backend.upsert(ids, docs, metas, vectors)
+    probe = rng.standard_normal(DIM)
+    assert [d for _, d, _ in whole.query(probe, 10)] == [d for _, d, _ in blocked.query(probe, 10)]
+
+
+def test_rejects_unknown_dtype(tmp_path):
+    with pytest.raises(ValueError):
+        NumpyBackend(tmp_path, dtype="float64")
@@ -18,8 +18,10 @@ import StatusBanner from "@/components/StatusBanner";
 import {
   startPipeline,
   getPipeline,
+  streamPipeline,
   approveShortlist,
   editEmail,
+  listDocuments,
   resetSession,
 } from "@/lib/api";
 import type {
@@ -29,7 +31,7 @@ import type {
   PipelineStatus,
 } from "@/lib/types";
 
-/* Polling statuses that require continued fetching */
+/* Statuses during which the backend keeps streaming updates */
 const ACTIVE_STATUSES: PipelineStatus[] = [
   "pending",
   "researching",
@@ -37,6 +39,9 @@ const ACTIVE_STATUSES: PipelineStatus[] = [
   "writing_emails",
 ];
 
+/* Delay before reopening a dropped event stream */
+const RECONNECT_DELAY_MS = 2000;
+
 export default function DashboardPage() {
   /* Upload state */
   const [jd, setJd] = useState<DocumentMeta | null>(null);
@@ -45,7 +50,7 @@ export default function DashboardPage() {
   /* Pipeline state */
   const [pipeline, setPipeline] = useState<PipelineRunResponse | null>(null);
   const [launching, setLaunching] = useState(false);
-  const pollingRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const streamRef = useRef<(() => void) | null>(null);
 
   /* Approval selection */
   const [selectedIds, setSelectedIds] = useState<Set<string>>(new Set());
@@ -57,41 +62,104 @@ export default function DashboardPage() {
   /* Top-N setting */
   const [topN, setTopN] = useState(5);
 
-  /* Polling logic */
-  const startPolling = useCallback((runId: string) => {
-    if (pollingRef.current) clearInterval(pollingRef.current);
-    pollingRef.current = setInterval(async () => {
-      try {
-        const data = await getPipeline(runId);
-        setPipeline(data);
-        if (!ACTIVE_STATUSES.includes(data.status)) {
-          clearInterval(pollingRef.current!);
-          pollingRef.current = null;
-        }
-      } catch {
-        clearInterval(pollingRef.current!);
-        pollingRef.current = null;
-      }
-    }, 3000);
+  /* Live updates (SSE) */
+  const stopStreaming = useCallback(() => {
+    if (streamRef.current) {
+      streamRef.current();
+      streamRef.current = null;
+    }
   }, []);
 
+  const startStreaming = useCallback(
+    (runId: string) => {
+      stopStreaming();
+      let retry: ReturnType<typeof setTimeout> | null = null;
+      let closeSource = () => {};
+      const stop = () => {
+        if (retry) clearTimeout(retry);
+        closeSource();
+      };
+      const connect = () => {
+        closeSource = streamPipeline(runId, {
+          onSnapshot: setPipeline,
+          onStatus: (status, error) => {
+            setPipeline((prev) => (prev ? { ...prev, status, error } : prev));
+            if (!ACTIVE_STATUSES.includes(status)) stopStreaming();
+          },
+          onJDAnalysis: (jd_analysis) =>
+            setPipeline((prev) => (prev ? { ...prev, jd_analysis } : prev)),
+          onEvaluation: (ev) =>
+            setPipeline((prev) =>
+              prev
+                ? {
+                    ...prev,
+                    evaluations: [
+                      ...prev.evaluations.filter((e) => e.resume_id !== ev.resume_id),
+                      ev,
+                    ],
+                  }
+                : prev
+            ),
+          onCandidateFailed: (failure) =>
+            setPipeline((prev) =>
+              prev
+                ? {
+                    ...prev,
+                    failed_candidates: [
+                      ...prev.failed_candidates.filter((f) => f.resume_id !== failure.resume_id),
+                      failure,
+                    ],
+                  }
+                : prev
+            ),
+          onEmail: (em) =>
+            setPipeline((prev) =>
+              prev
+                ? {
+                    ...prev,
+                    emails: [...prev.emails.filter((e) => e.resume_id !== em.resume_id), em],
+                  }
+                : prev
+            ),
+          onError: async () => {
+            // Stream closed or dropped — resync from the REST endpoint and
+            // reconnect while the run is still active
+            let active = true;
+            try {
+              const run = await getPipeline(runId);
+              setPipeline(run);
+              active = ACTIVE_STATUSES.includes(run.status);
+            } catch {
+              /* backend unreachable — keep retrying */
+            }
+            if (streamRef.current !== stop) return; // stopped or superseded meanwhile
+            if (active) retry = setTimeout(connect, RECONNECT_DELAY_MS);
+            else streamRef.current = null;
+          },
+        });
+      };
+      streamRef.current = stop;
+      connect();
+    },
+    [stopStreaming]
+  );
+
+  useEffect(() => stopStreaming, [stopStreaming]);
+
+  /* Handlers */  
+  /* The resume pool persists across JDs — load what is already indexed */
   useEffect(() => {
-    return () => {
-      if (pollingRef.current) clearInterval(pollingRef.current);
-    };
+    listDocuments()
+      .then((docs) => setResumes(docs.filter((d) => d.doc_type === "resume")))
+      .catch(console.error);
   }, []);
 
-  /* Handlers */  
   const handleNewJD = async (doc: DocumentMeta) => {
-    // Purge all previous session state for a clean slate
-    setResumes([]);
+    // New JD: reset pipeline state but keep the shared resume pool
     setPipeline(null);
     setSelectedIds(new Set());
     setTopN(5);
-    if (pollingRef.current) {
-      clearInterval(pollingRef.current);
-      pollingRef.current = null;
-    }
+    stopStreaming();
     setJd(doc);
   };
 
@@ -109,7 +177,7 @@ export default function DashboardPage() {
     try {
       const data = await startPipeline(jd.id, Math.min(topN, resumes.length));
       setPipeline(data);
-      startPolling(data.run_id);
+      startStreaming(data.run_id);
     } catch (err) {
       console.error(err);
       alert("Failed to start pipeline");
@@ -131,7 +199,7 @@ export default function DashboardPage() {
     try {
       const data = await approveShortlist(pipeline.run_id, Array.from(selectedIds));
       setPipeline(data);
-      startPolling(pipeline.run_id);
+      startStreaming(pipeline.run_id);
     } catch (err) {
       console.error(err);
       alert("Approval failed");
@@ -47,9 +47,17 @@ export default function UploadPanel({ onJDUploaded, onResumesUploaded, topN, onT
       if (!files || files.length === 0) return;
       setResumeLoading(true);
       try {
-        const docs = await uploadResumes(Array.from(files));
+        const results = await uploadResumes(Array.from(files));
+        const docs = results.flatMap((r) => (r.document ? [r.document] : []));
+        const failed = results.filter((r) => r.error);
         setResumeFiles(docs.map((d) => d.filename));
         onResumesUploaded(docs);
+        if (failed.length > 0) {
+          alert(
+            `Some resumes could not be processed:\n` +
+              failed.map((r) => `${r.filename}: ${r.error}`).join("\n")
+          );
+        }
       } catch (err) {
         console.error(err);
         alert("Failed to upload resumes");
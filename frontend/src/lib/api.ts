@@ -4,8 +4,11 @@
 
 import type {
   DocumentMeta,
+  JDMatchResult,
   OutreachEmail,
   PipelineRunResponse,
+  PipelineStreamHandlers,
+  ResumeUploadResult,
 } from "./types";
 
 const BASE = "/api";
@@ -26,10 +29,10 @@ export async function uploadJD(file: File): Promise<DocumentMeta> {
   return json<DocumentMeta>(await fetch(`${BASE}/upload/jd`, { method: "POST", body: fd }));
 }
 
-export async function uploadResumes(files: File[]): Promise<DocumentMeta[]> {
+export async function uploadResumes(files: File[]): Promise<ResumeUploadResult[]> {
   const fd = new FormData();
   files.forEach((f) => fd.append("files", f));
-  return json<DocumentMeta[]>(await fetch(`${BASE}/upload/resumes`, { method: "POST", body: fd }));
+  return json<ResumeUploadResult[]>(await fetch(`${BASE}/upload/resumes`, { method: "POST", body: fd }));
 }
 
 export async function listDocuments(): Promise<DocumentMeta[]> {
@@ -48,10 +51,64 @@ export async function startPipeline(jdId: string, topN = 5): Promise<PipelineRun
   );
 }
 
+export async function matchJDs(
+  jdIds: string[],
+  topN = 5,
+  startPipelines = false
+): Promise<JDMatchResult[]> {
+  return json<JDMatchResult[]>(
+    await fetch(`${BASE}/match/jds`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ jd_ids: jdIds, top_n: topN, start_pipelines: startPipelines }),
+    })
+  );
+}
+
 export async function getPipeline(runId: string): Promise<PipelineRunResponse> {
   return json<PipelineRunResponse>(await fetch(`${BASE}/pipeline/${runId}`));
 }
 
+export async function listPipelines(jdId?: string): Promise<PipelineRunResponse[]> {
+  const qs = jdId ? `?jd_id=${encodeURIComponent(jdId)}` : "";
+  return json<PipelineRunResponse[]>(await fetch(`${BASE}/pipeline${qs}`));
+}
+
+/** Subscribe to live pipeline updates. Returns a function that closes the stream. */
+export function streamPipeline(runId: string, handlers: PipelineStreamHandlers): () => void {
+  const source = new EventSource(`${BASE}/pipeline/${runId}/events`);
+  const on = <T>(event: string, cb: (data: T) => void) =>
+    source.addEventListener(event, (e) => cb(JSON.parse((e as MessageEvent).data) as T));
+
+  on<PipelineRunResponse>("snapshot", handlers.onSnapshot);
+  on<{ status: PipelineRunResponse["status"]; error: string | null }>("status", (d) =>
+    handlers.onStatus(d.status, d.error)
+  );
+  on("jd_analysis", handlers.onJDAnalysis);
+  on("evaluation", handlers.onEvaluation);
+  on("candidate_failed", handlers.onCandidateFailed);
+  on("email", handlers.onEmail);
+  source.onerror = () => {
+    // The server closes the stream once the run leaves an active status
+    source.close();
+    handlers.onError();
+  };
+  return () => source.close();
+}
+
+export async function addResumesToRun(
+  runId: string,
+  resumeIds: string[]
+): Promise<PipelineRunResponse> {
+  return json<PipelineRunResponse>(
+    await fetch(`${BASE}/pipeline/${runId}/resumes`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ resume_ids: resumeIds }),
+    })
+  );
+}
+
 export async function approveShortlist(
   runId: string,
   approvedResumeIds: string[]
@@ -82,6 +139,8 @@ export async function editEmail(
 
 /* ── Session ───────────────────────────────────────────────────────────────── */
 
-export async function resetSession(): Promise<void> {
-  await fetch(`${BASE}/session/reset`, { method: "POST" });
+/** Reset one workspace's JDs and runs, or everything (incl. resumes) when omitted. */
+export async function resetSession(workspaceId?: string): Promise<void> {
+  const qs = workspaceId ? `?workspace_id=${encodeURIComponent(workspaceId)}` : "";
+  await fetch(`${BASE}/session/reset${qs}`, { method: "POST" });
 }
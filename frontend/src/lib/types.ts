@@ -15,10 +15,19 @@ export interface DocumentMeta {
   id: string;
   filename: string;
   doc_type: "jd" | "resume";
+  workspace_id: string | null;
   text: string;
+  sha256: string;
+  duplicate_of: string | null;
   uploaded_at: string;
 }
 
+export interface ResumeUploadResult {
+  filename: string;
+  document: DocumentMeta | null;
+  error: string | null;
+}
+
 export interface JDAnalysis {
   role_title: string;
   technical_requirements: string[];
@@ -47,6 +56,37 @@ export interface CandidateEvaluation {
   shortlisted: boolean;
 }
 
+export interface CandidateFailure {
+  resume_id: string;
+  filename: string;
+  error: string;
+  attempts: number;
+}
+
+export interface CandidateScore {
+  resume_id: string;
+  filename: string;
+  retrieval_score: number;
+  rerank_score: number | null;
+  breakdown: Record<string, unknown>;
+  duplicate_ids: string[];
+}
+
+export interface JDMatchResult {
+  jd_id: string;
+  filename: string;
+  candidates: CandidateScore[];
+  run_id: string | null;
+}
+
+export interface LLMCallStats {
+  agent: string;
+  estimated_prompt_tokens: number;
+  prompt_tokens: number | null;
+  completion_tokens: number | null;
+  cached: boolean;
+}
+
 export interface OutreachEmail {
   resume_id: string;
   candidate_name: string;
@@ -58,7 +98,22 @@ export interface PipelineRunResponse {
   run_id: string;
   status: PipelineStatus;
   jd_analysis: JDAnalysis | null;
+  candidates: CandidateScore[];
   evaluations: CandidateEvaluation[];
+  failed_candidates: CandidateFailure[];
   emails: OutreachEmail[];
+  stage_timings: Record<string, number>;
+  llm_calls: LLMCallStats[];
   error: string | null;
 }
+
+/* Server-Sent Events pushed by GET /api/pipeline/{run_id}/events */
+export interface PipelineStreamHandlers {
+  onSnapshot: (run: PipelineRunResponse) => void;
+  onStatus: (status: PipelineStatus, error: string | null) => void;
+  onJDAnalysis: (analysis: JDAnalysis) => void;
+  onEvaluation: (evaluation: CandidateEvaluation) => void;
+  onCandidateFailed: (failure: CandidateFailure) => void;
+  onEmail: (email: OutreachEmail) => void;
+  onError: () => void;
+}